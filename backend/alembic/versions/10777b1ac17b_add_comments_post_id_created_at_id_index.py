@@ -0,0 +1,41 @@
+"""add comments post_id created_at id index
+
+Revision ID: 10777b1ac17b
+Revises: f53a6aab369e
+Create Date: 2026-10-17 10:03:27.551904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '10777b1ac17b'
+down_revision: Union[str, Sequence[str], None] = 'f53a6aab369e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # build without locking out comment writes on PostgreSQL; ignored elsewhere
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_comments_post_id_created_at_id',
+            'comments',
+            ['post_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_comments_post_id_created_at_id',
+            table_name='comments',
+            postgresql_concurrently=True,
+        )
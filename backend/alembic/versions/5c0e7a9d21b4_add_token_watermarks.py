@@ -0,0 +1,35 @@
+"""add token watermarks
+
+Revision ID: 5c0e7a9d21b4
+Revises: 81a807c86550
+Create Date: 2026-10-17 16:20:41.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e7a9d21b4'
+down_revision: Union[str, Sequence[str], None] = '81a807c86550'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'token_watermarks',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('not_before', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_index(op.f('ix_token_watermarks_not_before'), 'token_watermarks', ['not_before'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_token_watermarks_not_before'), table_name='token_watermarks')
+    op.drop_table('token_watermarks')
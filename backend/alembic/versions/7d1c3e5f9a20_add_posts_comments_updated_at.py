@@ -0,0 +1,35 @@
+"""add posts and comments updated_at
+
+Revision ID: 7d1c3e5f9a20
+Revises: e2a4b7c91f03
+Create Date: 2026-10-17 21:40:18.502116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d1c3e5f9a20'
+down_revision: Union[str, Sequence[str], None] = 'e2a4b7c91f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite cannot add a column with a non-constant default; the models set it on
+    # every insert and update instead
+    for table in ('posts', 'comments'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = created_at")
+        op.create_index(op.f(f'ix_{table}_updated_at'), table, ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('comments', 'posts'):
+        op.drop_index(op.f(f'ix_{table}_updated_at'), table_name=table)
+        op.drop_column(table, 'updated_at')
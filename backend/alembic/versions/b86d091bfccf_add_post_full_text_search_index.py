@@ -0,0 +1,43 @@
+"""add post full text search index
+
+Revision ID: b86d091bfccf
+Revises: d3f6ffa59583
+Create Date: 2026-10-17 13:48:19.062377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.search_helper import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b86d091bfccf'
+down_revision: Union[str, Sequence[str], None] = 'd3f6ffa59583'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # same DDL create_all runs: FTS5 table on SQLite, tsvector column + GIN on PostgreSQL
+    create_search_index(None, bind)
+    # the generated tsvector column fills itself; the FTS5 table needs the existing posts
+    if bind.dialect.name == 'sqlite' and sa.inspect(bind).has_table('posts_fts'):
+        op.execute(
+            "INSERT INTO posts_fts (rowid, title, content) "
+            "SELECT id, title, content FROM posts"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_posts_search_vector')
+        op.execute('ALTER TABLE posts DROP COLUMN IF EXISTS search_vector')
+    else:
+        drop_search_index(None, bind)
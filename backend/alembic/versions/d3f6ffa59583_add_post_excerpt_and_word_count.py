@@ -0,0 +1,64 @@
+"""add post excerpt and word count
+
+Revision ID: d3f6ffa59583
+Revises: 10777b1ac17b
+Create Date: 2026-10-17 11:26:05.740212
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.text_helper import EXCERPT_LENGTH, count_words, make_excerpt
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f6ffa59583'
+down_revision: Union[str, Sequence[str], None] = '10777b1ac17b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH + 3), server_default='', nullable=False))
+    op.add_column('posts', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False))
+
+    # backfill existing rows in id order, one batch of bodies in memory at a time
+    posts = sa.table(
+        'posts',
+        sa.column('id', sa.Integer),
+        sa.column('content', sa.Text),
+        sa.column('excerpt', sa.String),
+        sa.column('word_count', sa.Integer),
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(posts.c.id, posts.c.content)
+            .where(posts.c.id > last_id)
+            .order_by(posts.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            posts.update()
+            .where(posts.c.id == sa.bindparam('_id'))
+            .values(excerpt=sa.bindparam('_excerpt'), word_count=sa.bindparam('_word_count')),
+            [
+                {'_id': row.id, '_excerpt': make_excerpt(row.content), '_word_count': count_words(row.content)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'word_count')
+    op.drop_column('posts', 'excerpt')
@@ -8,6 +8,74 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+# "auto" uses the database's full-text index when it has one and the in-process
+# BM25 index otherwise; "native" and "bm25" force one or the other.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+# each worker process claims its own numbered directory under BM25_INDEX_DIR
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "search_index")
+# how often a BM25 index picks up rows other processes inserted or edited
+BM25_SYNC_SECONDS = float(os.getenv("BM25_SYNC_SECONDS", "30"))
+
+# in-process caches of serialized posts/users served by the multi-get endpoints
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+ENTITY_CACHE_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "300"))
+
+# serialized bodies of GET /posts/, /posts/{id} and /comments/post/{id}; writes
+# invalidate them right away, the TTL only bounds staleness across worker processes
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+# authenticated users by id, so get_current_user skips the users table; the TTL bounds
+# how long another worker process may keep using a changed role or a deleted user
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# verified session tokens -> claims, so repeat requests skip signature verification;
+# entries expire with the token itself
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# threads the sync route handlers and run_in_threadpool share, per worker process
+# (AnyIO's default is 40). The hot reads run on the async engine and take none. A
+# sync handler that queries holds a connection while it runs, so threads past
+# DB_POOL_SIZE + DB_MAX_OVERFLOW wait on the pool (see pool_metrics) rather than in
+# front of handlers that are served from the caches
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
+# how often each worker picks up token watermarks and revoked tokens written by other
+# workers, i.e. how long a role change, deletion or logout may take to reach sessions
+# served by another process
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "30"))
+
+# POST /posts/bulk: rows per multi-row INSERT, and the most items one request may carry
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "500"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+# POST /users/import: records per dedupe query / INSERT / commit
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", "500"))
+
+# pbkdf2_sha256 rounds for new password hashes (0 keeps passlib's default); when set,
+# older hashes are upgraded on the next successful login. Pick a value with
+# `python -m app.utils.password_helper --target-ms 250` on the production hardware.
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "0"))
+
+# POST /auth/login token buckets per client IP and per submitted email: average
+# attempts per minute (0 turns that limit off) and the burst allowed on top. Buckets
+# live in this process ("memory") or in a SQLite file every worker on the host shares.
+LOGIN_IP_RATE_PER_MINUTE = float(os.getenv("LOGIN_IP_RATE_PER_MINUTE", "30"))
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_EMAIL_RATE_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_RATE_PER_MINUTE", "5"))
+LOGIN_EMAIL_BURST = float(os.getenv("LOGIN_EMAIL_BURST", "10"))
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.db")
+
+# password hashing pool: "process" or "thread", its size (0 means one per CPU core),
+# how many calls may wait for it before logins get 503, and the Retry-After sent then
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+
 
 def get_access_token_expires() -> timedelta:
     return timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
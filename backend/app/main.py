@@ -1,16 +1,46 @@
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
-from .database import Base, engine
+from .config import THREADPOOL_SIZE
+from .database import (
+    Base,
+    SessionLocal,
+    dispose_async_engine,
+    engine,
+    sqlite_checkpointer,
+    write_queue,
+)
 from . import models
-from .routers import users, posts, comments, auth
+from .routers import users, posts, comments, auth, export, admin
+from .utils import auth_helper, search_helper
+from .utils.hash_executor import password_executor
 
 load_dotenv()
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Blog API Service")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # sync handlers (and run_in_threadpool) share this limiter
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    search_helper.init_search(engine, SessionLocal)
+    auth_helper.init_revocations(SessionLocal)
+    if sqlite_checkpointer is not None:
+        sqlite_checkpointer.start()
+    yield
+    write_queue.stop()
+    if sqlite_checkpointer is not None:
+        sqlite_checkpointer.stop()
+    search_helper.shutdown_search()
+    password_executor.shutdown()
+    await dispose_async_engine()
+
+
+app = FastAPI(title="Blog API Service", lifespan=lifespan)
 
 origins = [
     os.getenv("FRONTEND_URL"),
@@ -23,12 +53,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
     allow_credentials=True,
+    # lets the frontend read the ETag it sends back in If-None-Match
+    expose_headers=["ETag"],
 )
 
 app.include_router(auth.router)     
 app.include_router(users.router)
 app.include_router(posts.router)
 app.include_router(comments.router)
+app.include_router(export.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -1,5 +1,7 @@
 from .user_model import User
 from .post_model import Post
 from .comment_model import Comment
+from .token_watermark_model import TokenWatermark
+from .revoked_token_model import RevokedToken
 
-__all__ = ["User", "Post", "Comment"]
+__all__ = ["User", "Post", "Comment", "TokenWatermark", "RevokedToken"]
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
-from sqlalchemy.orm import relationship
+from collections import defaultdict
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, event, func
+from sqlalchemy.orm import Session, object_session, relationship
 from ..database import Base
+from .post_model import Post
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -10,6 +13,68 @@ class Comment(Base):
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # set on every insert and edit; the BM25 search indexes sync on it
+    updated_at = Column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now(), server_default=func.now()
+    )
 
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
+
+    __table_args__ = (
+        # per-post keyset pagination for GET /comments/post/{post_id}
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+        Index("ix_comments_updated_at", "updated_at"),
+    )
+
+
+# Keep Post.comment_count in step with the comments table. Mapper events fire for
+# every comment a flush inserts or deletes, including those removed by a cascade
+# (deleting a post or a user); they only tally a delta per post. after_flush then
+# applies the tallies in the same transaction, one UPDATE per distinct delta, and
+# skips posts deleted in that flush, so deleting a post with N comments or a user
+# who commented on many posts costs a statement or two instead of N.
+_DELTAS_KEY = "comment_count_deltas"
+
+
+def _tally(target, delta: int) -> None:
+    deltas = object_session(target).info.setdefault(_DELTAS_KEY, defaultdict(int))
+    deltas[target.post_id] += delta
+
+
+@event.listens_for(Comment, "after_insert")
+def _increment_comment_count(mapper, connection, target):
+    _tally(target, 1)
+
+
+@event.listens_for(Comment, "after_delete")
+def _decrement_comment_count(mapper, connection, target):
+    _tally(target, -1)
+
+
+@event.listens_for(Session, "before_flush")
+def _reset_comment_counts(session, flush_context, instances):
+    # tallies left behind by a flush that failed were rolled back with it
+    session.info.pop(_DELTAS_KEY, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_comment_counts(session, flush_context):
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if not deltas:
+        return
+    # session.deleted still lists what this flush deleted
+    deleted_posts = {obj.id for obj in session.deleted if isinstance(obj, Post)}
+    by_delta = defaultdict(list)
+    for post_id, delta in deltas.items():
+        if delta and post_id not in deleted_posts:
+            by_delta[delta].append(post_id)
+    posts = Post.__table__
+    connection = session.connection()
+    for delta, post_ids in by_delta.items():
+        connection.execute(
+            posts.update()
+            .where(posts.c.id.in_(post_ids))
+            # a new comment is not an edit of the post, so updated_at stays put
+            .values(comment_count=posts.c.comment_count + delta, updated_at=posts.c.updated_at)
+        )
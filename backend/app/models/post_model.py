@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, event, func
+from sqlalchemy.orm import relationship, validates
 from ..database import Base
+from ..utils.search_helper import create_search_index, drop_search_index
+from ..utils.text_helper import EXCERPT_LENGTH, count_words, make_excerpt
 
 class Post(Base):
     __tablename__ = "posts"
@@ -8,8 +10,34 @@ class Post(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
+    # derived from content on write so list views never have to load the body
+    excerpt = Column(String(EXCERPT_LENGTH + 3), nullable=False, server_default="")
+    word_count = Column(Integer, nullable=False, server_default="0")
+    # maintained by the Comment mapper events, see comment_model.py
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # set on every insert and edit; the BM25 search indexes sync on it
+    updated_at = Column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now(), server_default=func.now()
+    )
 
     owner = relationship("User", back_populates="posts")
-    comments = relationship("Comment", back_populates="post", cascade="all, delete")
\ No newline at end of file
+    comments = relationship("Comment", back_populates="post", cascade="all, delete")
+
+    @validates("content")
+    def _derive_summary(self, key, content):
+        self.excerpt = make_excerpt(content)
+        self.word_count = count_words(content)
+        return content
+
+    __table_args__ = (
+        # keyset pagination order for GET /posts/
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_updated_at", "updated_at"),
+    )
+
+
+# full-text index lives next to the table (FTS5 table / tsvector column + GIN)
+event.listen(Post.__table__, "after_create", create_search_index)
+event.listen(Post.__table__, "before_drop", drop_search_index)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Float, String
+from ..database import Base
+
+
+class RevokedToken(Base):
+    """
+    A session token revoked before its expiry (logout), by its ``jti`` claim.
+
+    Rows are only needed until the token would have expired anyway, so they are
+    purged once ``expires_at`` has passed. Timestamps are epoch seconds.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(Float, nullable=False, index=True)
+    revoked_at = Column(Float, nullable=False, index=True)
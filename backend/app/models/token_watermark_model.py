@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Float, Integer
+from ..database import Base
+
+
+class TokenWatermark(Base):
+    """
+    Session tokens of ``user_id`` issued before ``not_before`` are no longer accepted.
+
+    No foreign key to users: the row has to outlive a deleted user so their tokens
+    stay dead. Timestamps are epoch seconds, the same unit as the JWT ``iat`` claim.
+    """
+
+    __tablename__ = "token_watermarks"
+
+    user_id = Column(Integer, primary_key=True)
+    not_before = Column(Float, nullable=False, index=True)
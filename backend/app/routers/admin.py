@@ -0,0 +1,77 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, Query
+
+from ..database import pool_metrics, query_log, write_queue
+from ..utils.auth_helper import Principal, get_current_admin_user
+from ..utils.cache import cache_stats
+from ..utils.hash_executor import password_executor
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/cache")
+def get_cache_stats(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> List[Dict[str, Any]]:
+    """
+    Size and hit/miss/eviction counters of every in-process cache.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    """
+    return cache_stats()
+
+
+@router.get("/hashing")
+def get_hashing_stats(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Queue depth, rejections and latency of the password hashing executor.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    """
+    return password_executor.stats()
+
+
+@router.get("/pool")
+def get_pool_stats(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Database connection pool settings, current use and checkout counters, to size
+    the pool against real traffic.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    """
+    return pool_metrics.stats()
+
+
+@router.get("/queries")
+def get_query_stats(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Per-fingerprint statement counts and timings, most total time first.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    - limit must be between 1 and 1000
+    """
+    return query_log.stats(limit)
+
+
+@router.get("/writes")
+def get_write_queue_stats(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Queue depth, batch sizes and latency of the SQLite single-writer queue.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    """
+    return write_queue.stats()
@@ -1,34 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_async_db, run_sync, write_queue
 from ..utils.auth_helper import (
+    Principal,
     create_access_token,
     get_current_user,
+    get_session_claims,
+    revoke_token,
     SESSION_COOKIE_NAME,
 )
 from ..config import get_access_token_expires
+from ..utils.hash_executor import password_executor
+from ..utils.password_helper import verify_and_update
+from ..utils.rate_limit import check_login_rate_async
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+def _find_user(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+def _set_password_hash(db: Session, user: models.User, new_hash: str) -> models.User:
+    user.password_hash = new_hash
+    return user
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
 @router.post("/login", response_model=schemas.LoginResponse)
-def login(
+async def login(
     payload: schemas.LoginRequest,
+    request: Request,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(models.User).filter(models.User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+    """
+    Check credentials and start a session.
+
+    Attempts are rate limited per client IP and per email before anything else
+    happens, so a flood is turned away with 429 without a query or a hash.
+
+    The password check runs on the bounded password executor, so a burst of logins
+    cannot occupy the request threads; when its queue is full this answers 503 with
+    Retry-After right away. A stored hash made with outdated settings (e.g. fewer
+    rounds than PASSWORD_HASH_ROUNDS) is replaced with a fresh one while the
+    plain password is at hand.
+    """
+    await check_login_rate_async(request, payload.email)
+
+    user = await run_sync(db, _find_user, payload.email)
+    matched, new_hash = (False, None)
+    if user:
+        matched, new_hash = await password_executor.run(
+            verify_and_update, payload.password, user.password_hash
+        )
+    if not matched:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
         )
+    if new_hash:
+        user = await write_queue.run_async(db, _set_password_hash, user, new_hash)
+        await run_sync(db, lambda db: db.refresh(user))
 
     # create JWT
     token_expires = get_access_token_expires()
@@ -50,11 +83,16 @@ def login(
     return schemas.LoginResponse.from_orm(user)
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # revoke the token itself, so a copy of it stops working too
+    claims = get_session_claims(request)
+    if claims is not None:
+        await write_queue.run_async(db, revoke_token, claims)
+
     # clear cookie
     response.delete_cookie(key=SESSION_COOKIE_NAME, path="/")
     return {"detail": "Logged out"}
 
 @router.get("/me", response_model=schemas.LoginResponse)
-def read_me(current_user: models.User = Depends(get_current_user)):
+async def read_me(current_user: Principal = Depends(get_current_user)):
     return schemas.LoginResponse.from_orm(current_user)
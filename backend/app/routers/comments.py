@@ -1,20 +1,23 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from ..database import get_db
-from ..utils.auth_helper import get_current_user
-from typing import Optional
-from urllib.parse import quote_plus
+from ..database import get_async_db, run_sync, write_queue
+from ..utils.auth_helper import Principal, get_current_principal, get_current_user
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page
+from ..utils import search_helper
+from ..utils.cache import cached_json, post_cache, response_cache
+from ..utils.comment_helper import comment_out
+from typing import List, Optional
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
 @router.post("/", response_model=schemas.CommentOut, status_code=status.HTTP_201_CREATED)
-def create_comment(
+async def create_comment(
     comment: schemas.CommentCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Create a new comment on a blog post.
@@ -24,145 +27,186 @@ def create_comment(
     - user_id is automatically extracted from authenticated session
     - post_id is required in request body and must exist
     - content is required and validated by CommentCreate schema
-    """
-    # Validate post exists
-    post = db.query(models.Post).get(comment.post_id)
-    if not post:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Post with ID {comment.post_id} not found. Cannot create comment."
-        )
 
+    With SQLITE_WRITE_QUEUE on, the insert is committed by the single writer
+    (database.write_queue), batched with other writes queued at the same time.
+    """
+    def check_post(db: Session) -> None:
+        # Validate post exists
+        post = db.query(models.Post).get(comment.post_id)
+        if not post:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Post with ID {comment.post_id} not found. Cannot create comment."
+            )
+
+    await run_sync(db, check_post)
+    db_comment = await write_queue.run_async(db, _insert_comment, comment, current_user.id)
+    await run_sync(db, lambda db: db.refresh(db_comment))
+    # cached post carries the comment_count that just changed
+    post_cache.delete(comment.post_id)
+    response_cache.invalidate("posts", f"post:{comment.post_id}", f"comments:{comment.post_id}")
+
+    return comment_out(db_comment, current_user.name)
+
+
+def _insert_comment(db: Session, comment: schemas.CommentCreate, user_id: int) -> models.Comment:
     db_comment = models.Comment(
         content=comment.content,
         post_id=comment.post_id,
-        user_id=current_user.id,
+        user_id=user_id,
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-
-    # Build author info for response
-    author_name = current_user.name
-    avatar = (
-        f"https://ui-avatars.com/api/?name={quote_plus(author_name)}&background=ddd&color=555&rounded=true"
-        if author_name
-        else None
-    )
+    db.flush()
+    search_helper.index_comment(db, db_comment)
+    return db_comment
+
+
+@router.get("/post/{post_id}", response_model=schemas.Page[schemas.CommentOut])
+async def list_comments_for_post(
+    post_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    List comments on a post newest first, one keyset page at a time.
+
+    The (post_id, created_at, id) index serves each page as a range scan,
+    so deep pages on long threads cost the same as the first one. Pages are
+    served from the response cache until a comment on the post is written, with
+    an ETag; a matching If-None-Match gets 304 Not Modified. Runs on the async
+    engine, so a page being read holds no thread.
+    """
+    def build(db: Session):
+        # join comments with users to fetch author name in a single query
+        query = (
+            db.query(models.Comment, models.User.name)
+            .join(models.User, models.User.id == models.Comment.user_id)
+            .filter(models.Comment.post_id == post_id)
+        )
+        rows, next_cursor, prev_cursor = keyset_page(
+            db,
+            query,
+            models.Comment.created_at,
+            models.Comment.id,
+            key=lambda row: (row[0].created_at, row[0].id),
+            limit=limit,
+            after=after,
+            before=before,
+        )
+        return schemas.Page[schemas.CommentOut](
+            items=[comment_out(c, author_name) for c, author_name in rows],
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+        )
 
-    return {
-        "id": db_comment.id,
-        "content": db_comment.content,
-        "post_id": db_comment.post_id,
-        "user_id": db_comment.user_id,
-        "created_at": db_comment.created_at,
-        "author_name": author_name,
-        "author_avatar": avatar,
-    }
-
-
-@router.get("/post/{post_id}", response_model=List[schemas.CommentOut])
-def list_comments_for_post(post_id: int, db: Session = Depends(get_db)):
-    # join comments with users to fetch author name in a single query
-    rows = (
-        db.query(models.Comment, models.User.name)
-        .join(models.User, models.User.id == models.Comment.user_id)
-        .filter(models.Comment.post_id == post_id)
-        .order_by(models.Comment.created_at.desc())
-        .all()
+    key = ("comments", post_id, limit, after, before)
+    return await cached_json(
+        key, (f"comments:{post_id}",), lambda: run_sync(db, build), if_none_match
     )
 
-    out = []
-    for c, author_name in rows:
-        avatar = (
-            f"https://ui-avatars.com/api/?name={quote_plus(author_name)}&background=ddd&color=555&rounded=true"
-            if author_name
-            else None
-        )
-        out.append(
-            {
-                "id": c.id,
-                "content": c.content,
-                "post_id": c.post_id,
-                "user_id": c.user_id,
-                "created_at": c.created_at,
-                "author_name": author_name,
-                "author_avatar": avatar,
-            }
+
+@router.get("/search", response_model=List[schemas.CommentSearchHit])
+async def search_comments(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Full-text search over comments, best match first.
+
+    Only available with the in-process BM25 search backend.
+    """
+    try:
+        return await run_sync(db, search_helper.search_comments, q, limit, offset)
+    except search_helper.SearchUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Comment search is not enabled on this deployment",
         )
-    return out
 
 
 @router.put("/{comment_id}", response_model=schemas.CommentOut)
-def update_comment(
+async def update_comment(
     comment_id: int,
     payload: schemas.CommentUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    comment = db.query(models.Comment).get(comment_id)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Only the author or admin can edit
-    if comment.user_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
-
+    def load(db: Session) -> models.Comment:
+        comment = db.query(models.Comment).get(comment_id)
+        if not comment:
+            raise HTTPException(status_code=404, detail="Comment not found")
+
+        # Only the author or admin can edit
+        if comment.user_id != current_user.id and current_user.role != "admin":
+            raise HTTPException(status_code=403, detail="Not authorized")
+        return comment
+
+    def updated(db: Session) -> dict:
+        db.refresh(comment)
+        # fetch author name from users table
+        user = db.query(models.User).filter(models.User.id == comment.user_id).first()
+        return comment_out(comment, user.name if user else None)
+
+    comment = await run_sync(db, load)
+    comment = await write_queue.run_async(db, _update_comment, comment, payload)
+    response_cache.invalidate(f"comments:{comment.post_id}")
+    return await run_sync(db, updated)
+
+
+def _update_comment(
+    db: Session, comment: models.Comment, payload: schemas.CommentUpdate
+) -> models.Comment:
     if payload.content is not None:
         comment.content = payload.content
-
-    db.commit()
-    db.refresh(comment)
-
-    # fetch author name from users table
-    user = db.query(models.User).filter(models.User.id == comment.user_id).first()
-    author_name = user.name if user else None
-    avatar = (
-        f"https://ui-avatars.com/api/?name={quote_plus(author_name)}&background=ddd&color=555&rounded=true"
-        if author_name
-        else None
-    )
-
-    return {
-        "id": comment.id,
-        "content": comment.content,
-        "post_id": comment.post_id,
-        "user_id": comment.user_id,
-        "created_at": comment.created_at,
-        "author_name": author_name,
-        "author_avatar": avatar,
-    }
+        search_helper.index_comment(db, comment)
+    return comment
 
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_comment(
+async def delete_comment(
     comment_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """
     Delete a comment.
     
     Validation:
-    - Requires authentication via JWT token (get_current_user dependency)
+    - Requires authentication via JWT token (get_current_principal dependency)
     - Requires comment_id in URL path
     - User must be the comment author OR have admin role
     """
-    # Validate comment exists
-    comment = db.query(models.Comment).get(comment_id)
-    if not comment:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Comment with ID {comment_id} not found"
-        )
+    def load(db: Session) -> models.Comment:
+        # Validate comment exists
+        comment = db.query(models.Comment).get(comment_id)
+        if not comment:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Comment with ID {comment_id} not found"
+            )
+
+        # Validate ownership: only author or admin can delete
+        if comment.user_id != current_user.id and current_user.role != "admin":
+            raise HTTPException(
+                status_code=403, 
+                detail=f"Not authorized to delete this comment. User ID {current_user.id} does not own comment ID {comment_id}"
+            )
+        return comment
+
+    comment = await run_sync(db, load)
+    post_id = comment.post_id
+    await write_queue.run_async(db, _delete_comment, comment)
+    post_cache.delete(post_id)
+    response_cache.invalidate("posts", f"post:{post_id}", f"comments:{post_id}")
+    return None
 
-    # Validate ownership: only author or admin can delete
-    if comment.user_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(
-            status_code=403, 
-            detail=f"Not authorized to delete this comment. User ID {current_user.id} does not own comment ID {comment_id}"
-        )
 
+def _delete_comment(db: Session, comment: models.Comment) -> None:
+    search_helper.remove_comment(db, comment.id)
     db.delete(comment)
-    db.commit()
-    return None
@@ -0,0 +1,79 @@
+from typing import Iterator, Type
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..database import get_db
+from ..utils.auth_helper import Principal, get_current_admin_user
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+
+def _stream_ndjson(db: Session, stmt, schema: Type[BaseModel]) -> Iterator[str]:
+    """
+    Serialize ``stmt`` one cursor batch at a time.
+
+    ``yield_per`` makes the driver use a server-side cursor where it has one, so only
+    a single batch of rows is ever held in memory regardless of table size.
+    """
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for batch in result.partitions():
+        yield "".join(
+            schema.model_validate(row, from_attributes=True).model_dump_json() + "\n"
+            for row in batch
+        )
+
+
+@router.get("/posts", response_class=StreamingResponse)
+def export_posts(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user),
+):
+    """
+    Export every post as newline-delimited JSON, oldest first.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    """
+    stmt = select(
+        models.Post.id,
+        models.Post.title,
+        models.Post.content,
+        models.Post.owner_id,
+        models.Post.created_at,
+        models.Post.comment_count,
+    ).order_by(models.Post.id)
+    return StreamingResponse(
+        _stream_ndjson(db, stmt, schemas.Post), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+@router.get("/comments", response_class=StreamingResponse)
+def export_comments(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user),
+):
+    """
+    Export every comment as newline-delimited JSON, grouped by post.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    """
+    stmt = select(
+        models.Comment.id,
+        models.Comment.content,
+        models.Comment.post_id,
+        models.Comment.user_id,
+        models.Comment.created_at,
+    ).order_by(models.Comment.post_id, models.Comment.id)
+    return StreamingResponse(
+        _stream_ndjson(db, stmt, schemas.Comment), media_type=NDJSON_MEDIA_TYPE
+    )
@@ -1,103 +1,359 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Literal, Optional, Union
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
 from .. import models, schemas
-from ..database import get_db
-from ..utils.auth_helper import get_current_user
+from ..config import BULK_INSERT_BATCH_SIZE, BULK_MAX_ITEMS
+from ..database import get_async_db, run_sync, write_queue
+from ..utils.auth_helper import Principal, get_current_principal
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page
+from ..utils import search_helper
+from ..utils.batch_helper import batch_get, parse_ids
+from ..utils.cache import cached_json, post_cache, response_cache
+from ..utils.comment_helper import author_avatar, comment_out
+from ..utils.text_helper import count_words, make_excerpt
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
 
 @router.post("/", response_model=schemas.Post, status_code=status.HTTP_201_CREATED)
-def create_post(
+async def create_post(
     post: schemas.PostCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """
     Create a new blog post.
     
     Validation:
-    - Requires authentication via JWT token (get_current_user dependency)
+    - Requires authentication via JWT token (get_current_principal dependency)
     - user_id is automatically extracted from authenticated session
     - title and content are required fields validated by PostCreate schema
+
+    With SQLITE_WRITE_QUEUE on, the insert is committed by the single writer
+    (database.write_queue), batched with other writes queued at the same time.
     """
+    db_post = await write_queue.run_async(db, _insert_post, post, current_user.id)
+    response_cache.invalidate("posts")
+    await run_sync(db, lambda db: db.refresh(db_post))
+    return db_post
+
+
+def _insert_post(db: Session, post: schemas.PostCreate, owner_id: int) -> models.Post:
     db_post = models.Post(
         title=post.title,
         content=post.content,
-        owner_id=current_user.id,  # user_id from authenticated session
+        owner_id=owner_id,  # user_id from authenticated session
     )
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    db.flush()
+    search_helper.index_post(db, db_post)
     return db_post
 
 
-@router.get("/", response_model=List[schemas.Post])
-def list_posts(db: Session = Depends(get_db)):
-    return db.query(models.Post).all()
+def _insert_posts(db: Session, rows: List[dict], batch_size: int) -> List[int]:
+    stmt = insert(models.Post).returning(models.Post.id, sort_by_parameter_order=True)
+    ids: List[int] = []
+    for start in range(0, len(rows), batch_size):
+        ids.extend(db.execute(stmt, rows[start:start + batch_size]).scalars().all())
+    indexed = [
+        {"id": post_id, "title": row["title"], "content": row["content"]}
+        for row, post_id in zip(rows, ids)
+    ]
+    search_helper.index_posts(db, indexed)
+    return ids
+
+
+@router.post("/bulk", response_model=schemas.PostBulkResult)
+async def create_posts_bulk(
+    items: List[Dict[str, Any]] = Body(..., max_length=BULK_MAX_ITEMS),
+    batch_size: int = Query(BULK_INSERT_BATCH_SIZE, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    Create many posts in one transaction.
+
+    Each item is validated as a PostCreate on its own, so one bad item does not
+    reject the request; it is reported as invalid with its errors. Valid items are
+    inserted as multi-row INSERT ... RETURNING statements of batch_size rows.
+    """
+    results: List[Optional[dict]] = [None] * len(items)
+    rows = []
+    row_indexes = []
+    for index, item in enumerate(items):
+        try:
+            post = schemas.PostCreate.model_validate(item)
+        except ValidationError as exc:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "errors": exc.errors(include_url=False, include_context=False),
+            }
+            continue
+        rows.append(
+            {
+                "title": post.title,
+                "content": post.content,
+                # the content validator does not run for bulk INSERTs
+                "excerpt": make_excerpt(post.content),
+                "word_count": count_words(post.content),
+                "owner_id": current_user.id,
+            }
+        )
+        row_indexes.append(index)
+
+    ids = await write_queue.run_async(db, _insert_posts, rows, batch_size)
+    for index, post_id in zip(row_indexes, ids):
+        results[index] = {"index": index, "status": "created", "id": post_id}
+    response_cache.invalidate("posts")
+
+    return {
+        "created": len(rows),
+        "invalid": len(items) - len(rows),
+        "results": results,
+    }
+
+
+# columns needed by the summary view; the content body is never loaded
+SUMMARY_COLUMNS = (
+    models.Post.id,
+    models.Post.title,
+    models.Post.excerpt,
+    models.Post.word_count,
+    models.Post.owner_id,
+    models.Post.created_at,
+    models.Post.comment_count,
+)
+
+
+@router.get(
+    "/",
+    response_model=Union[schemas.Page[schemas.Post], schemas.Page[schemas.PostSummary]],
+)
+async def list_posts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    List posts newest first, one keyset page at a time.
+
+    - limit: page size
+    - after: next_cursor of the previous page
+    - before: prev_cursor of the current page
+    - view: "summary" selects only title, excerpt and word count instead of the full body
+
+    Pages are served from the response cache until a post or comment is written,
+    with an ETag; a matching If-None-Match gets 304 Not Modified. Runs on the
+    async engine, so a page being read holds no thread.
+    """
+    def build(db: Session):
+        if view == "summary":
+            query = db.query(*SUMMARY_COLUMNS)
+            page_schema = schemas.Page[schemas.PostSummary]
+        else:
+            query = db.query(models.Post)
+            page_schema = schemas.Page[schemas.Post]
+
+        posts, next_cursor, prev_cursor = keyset_page(
+            db,
+            query,
+            models.Post.created_at,
+            models.Post.id,
+            key=lambda p: (p.created_at, p.id),
+            limit=limit,
+            after=after,
+            before=before,
+        )
+        return page_schema(items=posts, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+    key = ("posts", view, limit, after, before)
+    return await cached_json(key, ("posts",), lambda: run_sync(db, build), if_none_match)
+
+
+@router.get("/search", response_model=List[schemas.PostSearchHit])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Full-text search over post titles and content, best match first.
+
+    Served by the database's own index: FTS5 on SQLite, tsvector + GIN on PostgreSQL.
+    Snippets are HTML-escaped post text with matched terms wrapped in <mark></mark>.
+    """
+    try:
+        return await run_sync(db, search_helper.search_posts, q, limit, offset)
+    except search_helper.SearchUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Full-text search is not available on this database",
+        )
+
+
+@router.get("/batch", response_model=schemas.Batch[schemas.Post])
+async def get_posts_batch(
+    ids: str = Query(..., description="Comma-separated post ids"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Fetch several posts at once, in request order.
+
+    Cached posts are served from memory; the rest come from one IN query.
+    Ids that do not exist are null in items and listed in missing.
+    """
+    return await run_sync(db, batch_get, models.Post, schemas.Post, post_cache, parse_ids(ids))
 
 
 @router.get("/{post_id}", response_model=schemas.Post)
-def get_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(models.Post).get(post_id)
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    return post
+async def get_post(
+    post_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    def build(db: Session):
+        post = db.query(models.Post).get(post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return schemas.Post.model_validate(post)
+
+    return await cached_json(
+        ("post", post_id), (f"post:{post_id}",), lambda: run_sync(db, build), if_none_match
+    )
+
+
+@router.get("/{post_id}/full", response_model=schemas.PostDetail)
+async def get_post_full(
+    post_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Everything the post page needs in one response: the post, its owner, the first
+    page of comments with their authors, and the total comment count.
+
+    Always two queries however long the thread is: the post joined to its owner,
+    then one keyset page of comments joined to their authors. Later comment pages
+    come from GET /comments/post/{post_id} with comments.next_cursor.
+    """
+    def build(db: Session):
+        post = (
+            db.query(models.Post)
+            .options(joinedload(models.Post.owner))
+            .filter(models.Post.id == post_id)
+            .first()
+        )
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+
+        comments, next_cursor, prev_cursor = keyset_page(
+            db,
+            db.query(models.Comment)
+            .options(joinedload(models.Comment.author))
+            .filter(models.Comment.post_id == post_id),
+            models.Comment.created_at,
+            models.Comment.id,
+            key=lambda c: (c.created_at, c.id),
+            limit=limit,
+        )
+
+        owner = post.owner
+        return {
+            **schemas.Post.model_validate(post).model_dump(),
+            "owner": (
+                {"id": owner.id, "name": owner.name, "avatar": author_avatar(owner.name)}
+                if owner
+                else None
+            ),
+            "comments": {
+                "items": [comment_out(c, c.author.name if c.author else None) for c in comments],
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor,
+            },
+        }
+
+    return await run_sync(db, build)
 
 
 @router.put("/{post_id}", response_model=schemas.Post)
-def update_post(
+async def update_post(
     post_id: int,
     post_update: schemas.PostUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    post = db.query(models.Post).get(post_id)
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
+    def load(db: Session) -> models.Post:
+        post = db.query(models.Post).get(post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
 
-    # authorization: owner or admin
-    if not (current_user.role == "admin" or current_user.id == post.owner_id):
-        raise HTTPException(status_code=403, detail="Not authorized to update this post")
+        # authorization: owner or admin
+        if not (current_user.role == "admin" or current_user.id == post.owner_id):
+            raise HTTPException(status_code=403, detail="Not authorized to update this post")
+        return post
 
+    post = await run_sync(db, load)
+    post = await write_queue.run_async(db, _update_post, post, post_update)
+    post_cache.delete(post_id)
+    response_cache.invalidate("posts", f"post:{post_id}")
+    await run_sync(db, lambda db: db.refresh(post))
+    return post
+
+
+def _update_post(db: Session, post: models.Post, post_update: schemas.PostUpdate) -> models.Post:
     post.title = post_update.title
     post.content = post_update.content
-    db.commit()
-    db.refresh(post)
+    search_helper.index_post(db, post)
     return post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(
+async def delete_post(
     post_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """
     Delete a blog post.
     
     Validation:
-    - Requires authentication via JWT token (get_current_user dependency)
+    - Requires authentication via JWT token (get_current_principal dependency)
     - Requires post_id in URL path
     - User must be the post owner OR have admin role
     """
-    # Validate post exists
-    post = db.query(models.Post).get(post_id)
-    if not post:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Post with ID {post_id} not found"
-        )
-    
-    # Validate ownership: only owner or admin can delete
-    if not (current_user.role == "admin" or current_user.id == post.owner_id):
-        raise HTTPException(
-            status_code=403, 
-            detail=f"Not authorized to delete this post. User ID {current_user.id} does not own post ID {post_id}"
-        )
+    def load(db: Session) -> models.Post:
+        # Validate post exists
+        post = db.query(models.Post).get(post_id)
+        if not post:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Post with ID {post_id} not found"
+            )
+        
+        # Validate ownership: only owner or admin can delete
+        if not (current_user.role == "admin" or current_user.id == post.owner_id):
+            raise HTTPException(
+                status_code=403, 
+                detail=f"Not authorized to delete this post. User ID {current_user.id} does not own post ID {post_id}"
+            )
+        return post
 
-    db.delete(post)
-    db.commit()
+    post = await run_sync(db, load)
+    await write_queue.run_async(db, _delete_post, post)
+    post_cache.delete(post_id)
+    response_cache.invalidate("posts", f"post:{post_id}", f"comments:{post_id}")
     return None
+
+
+def _delete_post(db: Session, post: models.Post) -> None:
+    search_helper.remove_post(db, post.id)
+    db.delete(post)
@@ -1,75 +1,229 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from typing import Iterable, List, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from .. import models, schemas
-from ..database import get_db
-from ..utils.auth_helper import get_current_user
-
-
-# password helpers
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+from ..config import USER_IMPORT_BATCH_SIZE
+from ..database import get_async_db, get_db, run_sync, write_queue
+from ..utils.auth_helper import (
+    Principal,
+    get_current_admin_user,
+    get_current_principal,
+    revoke_user_tokens,
+)
+from ..utils import import_helper, search_helper
+from ..utils.batch_helper import batch_get, parse_ids
+from ..utils.cache import post_cache, principal_cache, response_cache, user_cache
+from ..utils.hash_executor import password_executor
+from ..utils.password_helper import get_password_hash
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user: schemas.UserCreate,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # Bootstrapping: allow creating the very first user without authentication.
-    existing = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    def user_count(db: Session) -> int:
+        # Bootstrapping: allow creating the very first user without authentication.
+        existing = db.query(models.User).filter(models.User.email == user.email).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        return db.query(models.User).count()
 
-    user_count = db.query(models.User).count()
-    if user_count > 0:
+    if await run_sync(db, user_count) > 0:
         # require an admin to create users; attempt to get current user and verify admin role
         try:
-            current = get_current_user(request, db)
+            current = await get_current_principal(request, db)
         except HTTPException:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin required")
         if current.role != "admin":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin required")
 
+    password_hash = await password_executor.run(get_password_hash, user.password)
+    db_user = await write_queue.run_async(db, _insert_user, user, password_hash)
+    await run_sync(db, lambda db: db.refresh(db_user))
+    return db_user
+
+
+def _insert_user(db: Session, user: schemas.UserCreate, password_hash: str) -> models.User:
     db_user = models.User(
         email=user.email,
         name=user.name,
-        password_hash=get_password_hash(user.password),
+        password_hash=password_hash,
         role=user.role,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
     return db_user
 
 
+def _existing_emails(db: Session, emails: Iterable[str]) -> Set[str]:
+    emails = list(emails)
+    if not emails:
+        return set()
+    rows = db.query(models.User.email).filter(models.User.email.in_(emails)).all()
+    return {email for (email,) in rows}
+
+
+def _insert_rows(db: Session, rows: List[dict]) -> Tuple[List[int], Set[str]]:
+    # emails registered since the dedupe query outside this transaction are dropped
+    taken = _existing_emails(db, (row["email"] for row in rows))
+    rows = [row for row in rows if row["email"] not in taken]
+    stmt = insert(models.User).returning(models.User.id, sort_by_parameter_order=True)
+    ids = db.execute(stmt, rows).scalars().all() if rows else []
+    return ids, taken
+
+
+def _insert_users(db: Session, rows: List[dict]) -> Tuple[List[int], Set[str]]:
+    """
+    Insert ``rows`` with one multi-row INSERT and commit.
+
+    Emails registered after the caller's dedupe query are checked again inside the
+    write transaction. If a concurrent request still slips one in before the INSERT,
+    the unique index rejects the batch and it is retried once, when the check sees
+    that row. Returns the new ids in row order and the emails that were dropped.
+    """
+    try:
+        return write_queue.run(db, _insert_rows, rows)
+    except IntegrityError:
+        db.rollback()
+        return write_queue.run(db, _insert_rows, rows)
+
+
+async def _import_batch(db: Session, batch: List[Tuple[int, schemas.UserCreate]], results: List[dict]):
+    existing = await run_in_threadpool(_existing_emails, db, (user.email for _, user in batch))
+    fresh = []
+    for line, user in batch:
+        if user.email in existing:
+            results.append({"line": line, "email": user.email, "status": "duplicate"})
+        else:
+            fresh.append((line, user))
+    if not fresh:
+        return
+
+    hashes = await import_helper.hash_passwords(
+        get_password_hash, [user.password for _, user in fresh]
+    )
+    rows = [
+        {"email": user.email, "name": user.name, "password_hash": hashed, "role": user.role}
+        for (_, user), hashed in zip(fresh, hashes)
+    ]
+    ids, taken = await run_in_threadpool(_insert_users, db, rows)
+
+    new_ids = iter(ids)
+    for line, user in fresh:
+        if user.email in taken:
+            results.append({"line": line, "email": user.email, "status": "duplicate"})
+        else:
+            results.append(
+                {"line": line, "email": user.email, "status": "created", "id": next(new_ids)}
+            )
+
+
+@router.post("/import", response_model=schemas.UserImportResult)
+async def import_users(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin_user),
+):
+    """
+    Create users in bulk from an uploaded file.
+
+    The body is CSV with a header row (email,name,password[,role]), NDJSON, or a
+    JSON array of UserCreate objects, chosen by Content-Type. CSV and NDJSON are
+    processed as they stream in, USER_IMPORT_BATCH_SIZE records at a time: one
+    IN query drops emails that are already registered, passwords are hashed across
+    a process pool, and the rest are inserted and committed together.
+
+    Validation:
+    - Requires an admin session (get_current_admin_user dependency)
+    - Records that fail UserCreate validation are reported as invalid
+    - Emails already registered, or repeated earlier in the upload, are reported as duplicate
+    """
+    fmt = import_helper.import_format(request.headers.get("content-type"))
+    results: List[dict] = []
+    seen: Set[str] = set()
+    batch: List[Tuple[int, schemas.UserCreate]] = []
+
+    async for line, record, error in import_helper.iter_records(request.stream(), fmt):
+        if error is not None:
+            results.append({"line": line, "status": "invalid", "errors": [error]})
+            continue
+        try:
+            user = schemas.UserCreate.model_validate(record)
+        except ValidationError as exc:
+            results.append(
+                {
+                    "line": line,
+                    "email": record.get("email") if isinstance(record.get("email"), str) else None,
+                    "status": "invalid",
+                    "errors": exc.errors(include_url=False, include_context=False, include_input=False),
+                }
+            )
+            continue
+        if user.email in seen:
+            results.append({"line": line, "email": user.email, "status": "duplicate"})
+            continue
+        seen.add(user.email)
+        batch.append((line, user))
+        if len(batch) >= USER_IMPORT_BATCH_SIZE:
+            await _import_batch(db, batch, results)
+            batch = []
+    if batch:
+        await _import_batch(db, batch, results)
+
+    results.sort(key=lambda item: item["line"])
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    for item in results:
+        counts[item["status"]] += 1
+    return {
+        "created": counts["created"],
+        "duplicates": counts["duplicate"],
+        "invalid": counts["invalid"],
+        "results": results,
+    }
+
+
 @router.get("/", response_model=List[schemas.User])
-def list_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
+async def list_users(db: AsyncSession = Depends(get_async_db)):
+    return await run_sync(db, lambda db: db.query(models.User).all())
+
+
+@router.get("/batch", response_model=schemas.Batch[schemas.User])
+async def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user ids"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Fetch several users at once, in request order.
+
+    Cached users are served from memory; the rest come from one IN query.
+    Ids that do not exist are null in items and listed in missing.
+    """
+    return await run_sync(db, batch_get, models.User, schemas.User, user_cache, parse_ids(ids))
 
 
 @router.get("/{user_id}", response_model=schemas.User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(models.User).get(user_id)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await run_sync(db, lambda db: db.query(models.User).get(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    user = db.query(models.User).get(user_id)
+    user = await run_sync(db, lambda db: db.query(models.User).get(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -80,23 +234,39 @@ def update_user(
             detail="Not authorized to update this user"
         )
 
+    password_hash = None
+    if user_update.password is not None:
+        password_hash = await password_executor.run(get_password_hash, user_update.password)
+    user = await write_queue.run_async(db, _update_user, user, user_update, password_hash)
+    await run_sync(db, lambda db: db.refresh(user))
+    user_cache.delete(user_id)
+    principal_cache.delete(user_id)
+    if user_update.name is not None:
+        # author names are baked into cached comment pages
+        response_cache.clear()
+    return user
+
+
+def _update_user(
+    db: Session, user: models.User, user_update: schemas.UserUpdate, password_hash
+) -> models.User:
     if user_update.name is not None:
         user.name = user_update.name
     if user_update.role is not None:
         user.role = user_update.role
-    if user_update.password is not None:
-        user.password_hash = get_password_hash(user_update.password)
-
-    db.commit()
-    db.refresh(user)
+    if password_hash is not None:
+        user.password_hash = password_hash
+    if user_update.role is not None or password_hash is not None:
+        # tokens carry the role and outlive a password change; make them log in again
+        revoke_user_tokens(db, user.id)
     return user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
     # Authorization: only admins can delete users
     if current_user.role != "admin":
@@ -112,10 +282,21 @@ def delete_user(
             detail="Cannot delete your own account"
         )
 
-    user = db.query(models.User).get(user_id)
+    user = await run_sync(db, lambda db: db.query(models.User).get(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    db.delete(user)
-    db.commit()
+
+    await write_queue.run_async(db, _delete_user, user)
+    user_cache.delete(user_id)
+    principal_cache.delete(user_id)
+    # their posts are gone and their comments no longer count on anyone else's
+    post_cache.clear()
+    response_cache.clear()
     return None
+
+
+def _delete_user(db: Session, user: models.User) -> None:
+    # the user's posts and comments go with them (cascade), so drop them from search too
+    search_helper.remove_user_content(db, user.id)
+    revoke_user_tokens(db, user.id)
+    db.delete(user)
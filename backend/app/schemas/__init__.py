@@ -1,32 +1,61 @@
 # Users
-from .user import User, UserCreate, UserUpdate
+from .user import User, UserCreate, UserUpdate, UserSummary, UserImportItemResult, UserImportResult
 
 # Posts
-from .post import PostBase, Post, PostCreate, PostUpdate
+from .post import (
+    PostBase,
+    Post,
+    PostCreate,
+    PostUpdate,
+    PostSummary,
+    PostDetail,
+    PostSearchHit,
+    PostBulkItemResult,
+    PostBulkResult,
+)
 
 # Comments
-from .comment import CommentBase, Comment, CommentCreate, CommentUpdate, CommentOut
+from .comment import CommentBase, Comment, CommentCreate, CommentUpdate, CommentOut, CommentSearchHit
 
 # Auth
 from .login import LoginRequest, LoginResponse
 
+# Pagination
+from .page import Page
+
+# Multi-get
+from .batch import Batch
+
 __all__ = [
     # users
     "UserCreate",
     "UserUpdate",
     "User",
+    "UserSummary",
+    "UserImportItemResult",
+    "UserImportResult",
     # posts
     "PostBase",
     "PostCreate",
     "PostUpdate",
     "Post",
+    "PostSummary",
+    "PostDetail",
+    "PostSearchHit",
+    "PostBulkItemResult",
+    "PostBulkResult",
     # comments
     "CommentBase",
     "CommentCreate",
     "CommentUpdate",
     "Comment",
     "CommentOut",
+    "CommentSearchHit",
     # auth
     "LoginRequest",
     "LoginResponse",
+    # pagination
+    "Page",
+    # multi-get
+    "Batch",
 ]
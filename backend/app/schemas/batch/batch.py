@@ -0,0 +1,10 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Batch(BaseModel, Generic[T]):
+    # one entry per requested id, in request order; None where the id does not exist
+    items: List[Optional[T]]
+    missing: List[int]
@@ -3,5 +3,6 @@ from .comment import Comment
 from .comment_create import CommentCreate
 from .comment_update import CommentUpdate
 from .comment_out import CommentOut
+from .comment_search_hit import CommentSearchHit
 
-__all__ = ["CommentBase", "Comment", "CommentCreate", "CommentUpdate", "CommentOut"]
+__all__ = ["CommentBase", "Comment", "CommentCreate", "CommentUpdate", "CommentOut", "CommentSearchHit"]
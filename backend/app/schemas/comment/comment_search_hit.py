@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class CommentSearchHit(BaseModel):
+    id: int
+    post_id: int
+    user_id: Optional[int]
+    snippet: str
+    rank: float
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
@@ -2,5 +2,20 @@ from .post_base import PostBase
 from .post import Post
 from .post_create import PostCreate
 from .post_update import PostUpdate
+from .post_summary import PostSummary
+from .post_detail import PostDetail
+from .post_search_hit import PostSearchHit
+from .post_bulk_item_result import PostBulkItemResult
+from .post_bulk_result import PostBulkResult
 
-__all__ = ["PostBase", "Post", "PostCreate", "PostUpdate"]
+__all__ = [
+    "PostBase",
+    "Post",
+    "PostCreate",
+    "PostUpdate",
+    "PostSummary",
+    "PostDetail",
+    "PostSearchHit",
+    "PostBulkItemResult",
+    "PostBulkResult",
+]
@@ -8,4 +8,5 @@ class Post(PostBase):
     id: int
     owner_id: Optional[int]
     created_at: datetime
+    comment_count: int = 0
     model_config = ConfigDict(from_attributes=True)
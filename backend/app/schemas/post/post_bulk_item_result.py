@@ -0,0 +1,9 @@
+from typing import Any, List, Literal, Optional
+from pydantic import BaseModel
+
+
+class PostBulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "invalid"]
+    id: Optional[int] = None
+    errors: Optional[List[Any]] = None
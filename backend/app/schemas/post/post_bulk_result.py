@@ -0,0 +1,9 @@
+from typing import List
+from pydantic import BaseModel
+from .post_bulk_item_result import PostBulkItemResult
+
+
+class PostBulkResult(BaseModel):
+    created: int
+    invalid: int
+    results: List[PostBulkItemResult]
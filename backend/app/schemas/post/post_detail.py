@@ -0,0 +1,11 @@
+from typing import Optional
+from .post import Post
+from ..comment.comment_out import CommentOut
+from ..page.page import Page
+from ..user.user_summary import UserSummary
+
+
+class PostDetail(Post):
+    owner: Optional[UserSummary] = None
+    # first page of comments, newest first; the total is comment_count
+    comments: Page[CommentOut]
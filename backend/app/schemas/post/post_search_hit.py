@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class PostSearchHit(BaseModel):
+    id: int
+    title: str
+    snippet: str
+    rank: float
+    owner_id: Optional[int]
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class PostSummary(BaseModel):
+    id: int
+    title: str
+    excerpt: str
+    word_count: int
+    owner_id: Optional[int]
+    created_at: datetime
+    comment_count: int = 0
+    model_config = ConfigDict(from_attributes=True)
@@ -1,5 +1,8 @@
 from .user import User
 from .user_create import UserCreate
 from .user_update import UserUpdate
+from .user_summary import UserSummary
+from .user_import_item_result import UserImportItemResult
+from .user_import_result import UserImportResult
 
-__all__ = ["User", "UserCreate", "UserUpdate"]
+__all__ = ["User", "UserCreate", "UserUpdate", "UserSummary", "UserImportItemResult", "UserImportResult"]
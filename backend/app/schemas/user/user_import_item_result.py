@@ -0,0 +1,10 @@
+from typing import Any, List, Literal, Optional
+from pydantic import BaseModel
+
+
+class UserImportItemResult(BaseModel):
+    line: int
+    email: Optional[str] = None
+    status: Literal["created", "duplicate", "invalid"]
+    id: Optional[int] = None
+    errors: Optional[List[Any]] = None
@@ -0,0 +1,10 @@
+from typing import List
+from pydantic import BaseModel
+from .user_import_item_result import UserImportItemResult
+
+
+class UserImportResult(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[UserImportItemResult]
@@ -0,0 +1,9 @@
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class UserSummary(BaseModel):
+    id: int
+    name: str
+    avatar: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
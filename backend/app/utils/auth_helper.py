@@ -1,22 +1,50 @@
+import hashlib
+import threading
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import Depends, HTTPException, status, Request
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_async_db, run_sync
 from .. import models
-from ..config import SECRET_KEY, ALGORITHM, get_access_token_expires
+from ..config import (
+    SECRET_KEY,
+    ALGORITHM,
+    TOKEN_REVOCATION_REFRESH_SECONDS,
+    get_access_token_expires,
+)
+from .cache import principal_cache, token_cache
 
 
 SESSION_COOKIE_NAME = "session"
 
 
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated caller, detached from any session so it can be cached and
+    shared between requests. get_current_principal fills in only id and role, from
+    the token; get_current_user also loads name and email.
+    """
+
+    id: int
+    role: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or get_access_token_expires())
-    to_encode.update({"exp": expire})
+    # sub-second iat, so a token issued right after a watermark is still accepted;
+    # jti names this one token so it can be revoked on its own
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -33,39 +61,255 @@ def _get_token_from_request(request: Request) -> Optional[str]:
     return None
 
 
-def get_current_user(
-    request: Request,
-    db: Session = Depends(get_db),
-) -> models.User:
+def decode_token(token: str) -> dict:
+    """
+    Verify ``token`` and return its claims, raising JWTError if it is not valid.
+
+    Verified claims are memoized under a digest of the token until the token's own
+    exp, so a session only pays for signature verification on its first request.
+    The returned dict is shared between requests and must not be modified.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        remaining = float(claims.get("exp", 0)) - time.time()
+        if remaining > 0:
+            token_cache.set(digest, claims, ttl=remaining)
+    return claims
+
+
+def get_session_claims(request: Request) -> Optional[dict]:
+    """Claims of the request's session token, or None when it has none or it is invalid."""
+    token = _get_token_from_request(request)
+    if not token:
+        return None
+    try:
+        return decode_token(token)
+    except JWTError:
+        return None
+
+
+# ---- revocation -------------------------------------------------------------------
+#
+# Two ways to end sessions before they expire, both checked on every request without
+# a query:
+#
+# - per user: a watermark (models.TokenWatermark) written on a role change, password
+#   change or deletion; every token of that user issued before it is rejected
+# - per token: the jti of a logged-out token (models.RevokedToken)
+#
+# Each process holds both in plain dicts, so the common not-revoked case is one or
+# two hash lookups, and picks up rows other processes wrote every
+# TOKEN_REVOCATION_REFRESH_SECONDS. Revoked jtis are dropped from memory and from the
+# table once the token would have expired anyway.
+
+# how often expired jtis are dropped from memory
+TOKEN_REVOCATION_COMPACT_SECONDS = 600
+
+_watermarks: Dict[int, float] = {}
+_revoked: Dict[str, float] = {}  # jti -> token exp
+_lock = threading.Lock()
+_watermarks_seen_until = 0.0
+_revoked_seen_until = 0.0
+_next_refresh = 0.0
+_next_compaction = 0.0
+
+
+def _remember_watermark(user_id: int, not_before: float) -> None:
+    global _watermarks_seen_until
+    with _lock:
+        if not_before > _watermarks.get(user_id, 0.0):
+            _watermarks[user_id] = not_before
+        _watermarks_seen_until = max(_watermarks_seen_until, not_before)
+
+
+def _remember_revoked(jti: str, expires_at: float, revoked_at: float) -> None:
+    global _revoked_seen_until
+    with _lock:
+        _revoked[jti] = expires_at
+        _revoked_seen_until = max(_revoked_seen_until, revoked_at)
+
+
+def _compact_revoked(now: float) -> None:
+    """Forget revoked jtis whose token has expired; they fail the exp check anyway."""
+    global _revoked, _next_compaction
+    with _lock:
+        # swap in a new dict so readers never see one being resized
+        _revoked = {jti: exp for jti, exp in _revoked.items() if exp > now}
+        _next_compaction = time.monotonic() + TOKEN_REVOCATION_COMPACT_SECONDS
+
+
+def refresh_revocations(db: Session) -> None:
+    """
+    Load watermarks and revoked jtis written since the last refresh.
+
+    Looks back one refresh interval past the newest row already seen, so clock skew
+    between workers does not make us miss one. The first call loads everything.
+    """
+    global _next_refresh
+    now = time.time()
+    since = _watermarks_seen_until - TOKEN_REVOCATION_REFRESH_SECONDS
+    for user_id, not_before in (
+        db.query(models.TokenWatermark.user_id, models.TokenWatermark.not_before)
+        .filter(models.TokenWatermark.not_before > since)
+        .all()
+    ):
+        _remember_watermark(user_id, not_before)
+
+    since = _revoked_seen_until - TOKEN_REVOCATION_REFRESH_SECONDS
+    for jti, expires_at, revoked_at in (
+        db.query(models.RevokedToken.jti, models.RevokedToken.expires_at, models.RevokedToken.revoked_at)
+        .filter(models.RevokedToken.revoked_at > since, models.RevokedToken.expires_at > now)
+        .all()
+    ):
+        _remember_revoked(jti, expires_at, revoked_at)
+
+    if time.monotonic() >= _next_compaction:
+        _compact_revoked(now)
+    _next_refresh = time.monotonic() + TOKEN_REVOCATION_REFRESH_SECONDS
+
+
+def init_revocations(session_factory) -> None:
+    """Load all revocations at startup, after purging the rows of expired tokens."""
+    db = session_factory()
+    try:
+        db.query(models.RevokedToken).filter(
+            models.RevokedToken.expires_at <= time.time()
+        ).delete(synchronize_session=False)
+        db.commit()
+        refresh_revocations(db)
+    finally:
+        db.close()
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> None:
+    """
+    Invalidate every token issued to ``user_id`` so far.
+
+    Adds the watermark to the caller's transaction; it is applied in this process
+    right away, and by the others on their next refresh.
+    """
+    not_before = time.time()
+    watermark = db.get(models.TokenWatermark, user_id)
+    if watermark is None:
+        db.add(models.TokenWatermark(user_id=user_id, not_before=not_before))
+    else:
+        watermark.not_before = not_before
+    _remember_watermark(user_id, not_before)
+
+
+def revoke_token(db: Session, claims: dict) -> None:
+    """
+    Invalidate the single token ``claims`` were decoded from.
+
+    Adds the row to the caller's transaction and applies it in this process right
+    away. Tokens issued before jti was introduced cannot be revoked this way.
+    """
+    jti = claims.get("jti")
+    if not jti:
+        return
+    revoked_at = time.time()
+    expires_at = float(claims["exp"])
+    db.merge(models.RevokedToken(jti=jti, expires_at=expires_at, revoked_at=revoked_at))
+    _remember_revoked(jti, expires_at, revoked_at)
+
+
+def is_revoked(claims: dict) -> bool:
+    if float(claims.get("iat", 0)) < _watermarks.get(int(claims["sub"]), 0.0):
+        return True
+    jti = claims.get("jti")
+    return jti is not None and jti in _revoked
+
+
+# ---- dependencies -----------------------------------------------------------------
+
+def _request_token(request: Request) -> str:
     token = _get_token_from_request(request)
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
         )
+    return token
+
 
+def _principal_from_token(token: str) -> Principal:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id: int = int(payload.get("sub"))
-    except (JWTError, TypeError, ValueError):
+        role: str = payload["role"]
+        revoked = is_revoked(payload)
+    except (JWTError, KeyError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid session",
         )
 
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session expired, please log in again",
+        )
+
+    return Principal(id=user_id, role=role)
+
+
+async def get_current_principal(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    Resolve the session token to a Principal with id and role, from its claims alone.
+
+    Costs no query apart from the periodic revocation refresh, run on the async
+    engine; the session is only connected when that refresh runs. Use it wherever
+    the caller's id and role are all that is needed.
+    """
+    token = _request_token(request)
+    if time.monotonic() >= _next_refresh:
+        await run_sync(db, refresh_revocations)
+    return _principal_from_token(token)
+
+
+def _load_principal(db: Session, user_id: int) -> Optional[Principal]:
     user = db.query(models.User).get(user_id)
     if not user:
+        return None
+    return Principal(id=user.id, role=user.role, name=user.name, email=user.email)
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    The caller's Principal including name and email.
+
+    Principals are cached by user id, so repeat requests from the same user do not
+    touch the users table; users.update_user / delete_user evict the entry. A miss
+    is read on the async engine, so resolving the caller never takes a thread.
+    """
+    cached = principal_cache.get(principal.id)
+    if cached is not None:
+        return cached
+
+    # an update or delete of the user while this reads is not cached over
+    generation = principal_cache.generation(principal.id)
+    cached = await run_sync(db, _load_principal, principal.id)
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
 
-    return user
+    principal_cache.set(cached.id, cached, generation=generation)
+    return cached
 
 
 def get_current_admin_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
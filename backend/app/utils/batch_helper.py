@@ -0,0 +1,52 @@
+from typing import List, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+
+
+MAX_BATCH_IDS = 500
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated ``ids`` query value, keeping request order."""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers",
+        )
+    if not parsed:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No ids given")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_IDS} ids per request",
+        )
+    return parsed
+
+
+def batch_get(db: Session, model, schema: Type[BaseModel], cache: TTLCache, ids: List[int]) -> dict:
+    """
+    Resolve ``ids`` to serialized rows: cached ones from ``cache``, the rest with a
+    single ``IN`` query. Items come back in request order, with None for misses.
+    Rows a concurrent write evicted while the query ran are returned but not cached.
+    """
+    wanted = list(dict.fromkeys(ids))
+    found = cache.get_many(wanted)
+
+    uncached = [i for i in wanted if i not in found]
+    if uncached:
+        generations = cache.generations(uncached)
+        for row in db.query(model).filter(model.id.in_(uncached)).all():
+            value = schema.model_validate(row)
+            cache.set(row.id, value, generation=generations[row.id])
+            found[row.id] = value
+
+    return {
+        "items": [found.get(i) for i in ids],
+        "missing": [i for i in wanted if i not in found],
+    }
@@ -0,0 +1,331 @@
+import heapq
+import json
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Pure-Python inverted index ranked with Okapi BM25.
+#
+# Postings live in memory as term -> {doc_id: term frequency}, so a query only touches
+# the postings of its own terms. On disk an index is two files next to each other:
+#
+#   <path>.snapshot  pickled postings, rewritten atomically on compaction
+#   <path>.journal   append-only JSON lines of already-tokenized adds/removes and
+#                    watermark changes
+#
+# Loading replays the journal over the snapshot, so a restart never re-tokenizes the
+# corpus. The ``watermark`` is the caller's own JSON value saying how far the index
+# has been synced with its source. The index is per process: with several workers
+# each claims its own directory with claim_directory().
+
+TOKEN_RE = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for if in into is it no not of on or such "
+    "that the their then there these they this to was will with".split()
+)
+
+# a title term counts as this many body occurrences
+TITLE_WEIGHT = 2
+
+SNAPSHOT_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _try_lock(handle: IO) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def claim_directory(base: str, max_slots: int = 64) -> Tuple[str, IO]:
+    """
+    Claim the first of ``base/0``, ``base/1``, ... that no other live process holds
+    and return it with the open lock file, which keeps the claim until it is closed
+    (or the process exits). A restarted worker takes over a free slot, snapshot and
+    all, so indexes are reused across restarts but never written by two processes.
+    """
+    for slot in range(max_slots):
+        path = os.path.join(base, str(slot))
+        os.makedirs(path, exist_ok=True)
+        handle = open(os.path.join(path, "lock"), "a+")
+        if _try_lock(handle):
+            return path, handle
+        handle.close()
+    raise RuntimeError(f"All {max_slots} index directories under {base!r} are in use")
+
+
+class BM25Index:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_after: int = 10000,
+    ):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.compact_after = compact_after
+
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._total_len = 0
+        self._max_id: Optional[int] = 0
+        self._watermark = None
+
+        self._journal = None
+        self._journal_entries = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_len
+
+    @property
+    def max_doc_id(self) -> int:
+        """Highest indexed id (0 when empty); with len() the index's high-water mark."""
+        with self._lock:
+            if self._max_id is None:
+                self._max_id = max(self._doc_len, default=0)
+            return self._max_id
+
+    @property
+    def watermark(self):
+        """How far the caller has synced the index with its source (None: unknown)."""
+        return self._watermark
+
+    @watermark.setter
+    def watermark(self, value) -> None:
+        with self._lock:
+            if value != self._watermark:
+                self._watermark = value
+                self._log(["w", value])
+
+    # ---- updates -------------------------------------------------------------
+
+    def add(self, doc_id: int, text: str, title: str = "") -> None:
+        """Index ``doc_id``, replacing whatever was indexed under it before."""
+        freqs = Counter(tokenize(text))
+        for term in tokenize(title):
+            freqs[term] += TITLE_WEIGHT
+        with self._lock:
+            self._apply_add(doc_id, freqs)
+            self._log(["a", doc_id, freqs])
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            if doc_id in self._doc_len:
+                self._apply_remove(doc_id)
+                self._log(["r", doc_id])
+
+    def build(self, docs: Iterable[Tuple[int, str, str]]) -> None:
+        """Replace the contents with (doc_id, text, title) tuples and write a fresh snapshot."""
+        with self._lock:
+            self._postings, self._doc_len, self._doc_terms = {}, {}, {}
+            self._total_len, self._max_id = 0, 0
+            self._watermark = None
+            for doc_id, text, title in docs:
+                freqs = Counter(tokenize(text))
+                for term in tokenize(title):
+                    freqs[term] += TITLE_WEIGHT
+                self._apply_add(doc_id, freqs)
+            self.snapshot()
+
+    def _apply_add(self, doc_id: int, freqs: Dict[str, int]) -> None:
+        if doc_id in self._doc_len:
+            # replacing a document leaves the high-water mark where it was
+            max_id = self._max_id
+            self._apply_remove(doc_id)
+            self._max_id = max_id
+        postings = self._postings
+        for term, tf in freqs.items():
+            postings.setdefault(term, {})[doc_id] = tf
+        length = sum(freqs.values())
+        self._doc_terms[doc_id] = tuple(freqs)
+        self._doc_len[doc_id] = length
+        self._total_len += length
+        if self._max_id is not None and doc_id > self._max_id:
+            self._max_id = doc_id
+
+    def _apply_remove(self, doc_id: int) -> None:
+        for term in self._doc_terms.pop(doc_id):
+            docs = self._postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        if doc_id == self._max_id:
+            self._max_id = None  # recomputed on next use
+
+    # ---- queries -------------------------------------------------------------
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs, best first, for documents matching any query term."""
+        terms = set(tokenize(query))
+        k = offset + limit
+        with self._lock:
+            n = len(self._doc_len)
+            if not n or not terms or k <= 0:
+                return []
+            k1 = self.k1
+            avgdl = self._total_len / n
+            norm_const = k1 * (1 - self.b)
+            norm_len = k1 * self.b / avgdl
+            doc_len = self._doc_len
+
+            # (idf * (k1 + 1), postings) per term, rarest first; the weight is also the
+            # most a single term can add to any document's score
+            lists = []
+            for term in terms:
+                docs = self._postings.get(term)
+                if docs:
+                    df = len(docs)
+                    weight = math.log(1 + (n - df + 0.5) / (df + 0.5)) * (k1 + 1)
+                    lists.append((weight, docs))
+            lists.sort(key=lambda item: item[0], reverse=True)
+
+            scores: Dict[int, float] = {}
+            get = scores.get
+            remaining = sum(weight for weight, _ in lists)
+            for i, (weight, docs) in enumerate(lists):
+                if len(scores) >= k and remaining < heapq.nlargest(k, scores.values())[-1]:
+                    # MaxScore: a document not seen yet can no longer reach the top k, so
+                    # the long postings of the common terms left are only probed for the
+                    # documents already scored instead of being walked in full
+                    for weight, docs in lists[i:]:
+                        probe = docs.keys() & scores.keys() if len(docs) < len(scores) else scores
+                        for doc_id in probe:
+                            tf = docs.get(doc_id)
+                            if tf:
+                                scores[doc_id] += weight * tf / (
+                                    tf + norm_const + norm_len * doc_len[doc_id]
+                                )
+                    break
+                remaining -= weight
+                for doc_id, tf in docs.items():
+                    scores[doc_id] = get(doc_id, 0.0) + weight * tf / (
+                        tf + norm_const + norm_len * doc_len[doc_id]
+                    )
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+        return top[offset:]
+
+    # ---- persistence ---------------------------------------------------------
+
+    @property
+    def _snapshot_path(self) -> str:
+        return f"{self.path}.snapshot"
+
+    @property
+    def _journal_path(self) -> str:
+        return f"{self.path}.journal"
+
+    def load(self) -> bool:
+        """
+        Restore the index from disk and start journaling.
+
+        Returns False when there was no snapshot, in which case the caller is expected
+        to ``build()`` the index from the source of truth.
+        """
+        with self._lock:
+            if not os.path.exists(self._snapshot_path):
+                return False
+            with open(self._snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+            if snapshot[0] != SNAPSHOT_VERSION:
+                return False
+            _, postings, doc_len, doc_terms, total_len, watermark = snapshot
+            self._postings, self._doc_len = postings, doc_len
+            self._doc_terms, self._total_len = doc_terms, total_len
+            self._watermark = watermark
+            self._max_id = None
+
+            if os.path.exists(self._journal_path):
+                with open(self._journal_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break  # torn final write from a crash
+                        if entry[0] == "a":
+                            self._apply_add(entry[1], entry[2])
+                        elif entry[0] == "w":
+                            self._watermark = entry[1]
+                        elif entry[1] in self._doc_len:
+                            self._apply_remove(entry[1])
+                # fold the replayed journal into a new snapshot
+                self.snapshot()
+            else:
+                self._open_journal()
+            return True
+
+    def snapshot(self) -> None:
+        """Atomically write the whole index to disk and truncate the journal."""
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self._snapshot_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    (
+                        SNAPSHOT_VERSION,
+                        self._postings,
+                        self._doc_len,
+                        self._doc_terms,
+                        self._total_len,
+                        self._watermark,
+                    ),
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, self._snapshot_path)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            open(self._journal_path, "w").close()
+            self._open_journal()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._journal_entries:
+                self.snapshot()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _open_journal(self) -> None:
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._journal_entries = 0
+
+    def _log(self, entry: list) -> None:
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_after:
+            self.snapshot()
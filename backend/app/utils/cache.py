@@ -0,0 +1,341 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Response, status
+from pydantic import BaseModel
+
+from ..config import (
+    ENTITY_CACHE_SIZE,
+    ENTITY_CACHE_TTL_SECONDS,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+    TOKEN_CACHE_SIZE,
+    get_access_token_expires,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+_MISSING = object()
+
+# every cache created here, so tests (and admin tooling) can reset them in one call
+_registry: List[Any] = []
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a bounded number of entries and a per-entry expiry.
+
+    Expired entries are dropped lazily when they are looked up or when they reach the
+    cold end of the LRU order.
+
+    Each key also has a generation that ``delete`` (and ``clear``) moves forward. A
+    reader takes the generation before querying and passes it to ``set``, which then
+    skips storing a value read before a concurrent write deleted the key, the same
+    guard ResponseCache has with tag versions. Only the last ``maxsize`` deleted keys
+    keep their own generation; the others share the highest one forgotten, which at
+    worst skips a store that would have been fine.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generations: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._last_generation = 0
+        self._forgotten_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry.append(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._get(key, time.monotonic())
+        return default if value is _MISSING else value
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Return the cached subset of ``keys``; absent keys are simply left out."""
+        found = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                value = self._get(key, now)
+                if value is not _MISSING:
+                    found[key] = value
+        return found
+
+    def generation(self, key: Hashable) -> int:
+        """Take before reading the value to ``set``, see the class docstring."""
+        with self._lock:
+            return self._generations.get(key, self._forgotten_generation)
+
+    def generations(self, keys: Iterable[Hashable]) -> Dict[Hashable, int]:
+        with self._lock:
+            return {key: self._generations.get(key, self._forgotten_generation) for key in keys}
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Store ``value``; with ``generation``, only if ``key`` was not deleted since."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if (
+                generation is not None
+                and generation != self._generations.get(key, self._forgotten_generation)
+            ):
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._last_generation += 1
+                self._generations[key] = self._last_generation
+                self._generations.move_to_end(key)
+            while len(self._generations) > self.maxsize:
+                _, forgotten = self._generations.popitem(last=False)
+                self._forgotten_generation = max(self._forgotten_generation, forgotten)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            # every key counts as deleted
+            self._generations.clear()
+            self._last_generation += 1
+            self._forgotten_generation = self._last_generation
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _get(self, key: Hashable, now: float) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            self.misses += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of serialized response bodies and their ETags, bounded by entry
+    count, by total body size and by a per-entry expiry.
+
+    Every entry carries the tags of the data it was built from, and writers call
+    ``invalidate(tag)`` to drop exactly the entries that depend on what they changed.
+    Each tag also has a version that ``invalidate`` bumps; a body built while one of
+    its tags was being invalidated is not stored, so a slow reader cannot put back a
+    response that a concurrent write just made stale.
+    """
+
+    def __init__(self, name: str, maxsize: int, max_bytes: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expires_at, body, etag, tags)
+        self._data: "OrderedDict[Hashable, Tuple[float, bytes, str, Tuple[str, ...]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[Hashable]] = {}
+        self._versions: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry.append(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        """Return ``(body, etag)``, or None when ``key`` is not cached or has expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(
+        self,
+        key: Hashable,
+        body: bytes,
+        etag: str,
+        tags: Tuple[str, ...],
+        versions: Tuple[int, ...],
+    ) -> None:
+        """Store ``body`` unless one of ``tags`` was invalidated since ``versions`` was read."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if versions != tuple(self._versions.get(tag, 0) for tag in tags):
+                return
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, body, etag, tags)
+            self._bytes += len(body)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in self._keys_by_tag.pop(tag, ()):
+                    if key in self._data:
+                        self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry and invalidate every tag."""
+        with self._lock:
+            self._data.clear()
+            self._keys_by_tag.clear()
+            self._bytes = 0
+            # every entry is tagged _ALL_TAGS, so this also rejects in-flight builds
+            self._versions[_ALL_TAGS] = self._versions.get(_ALL_TAGS, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, body, _, tags = self._data.pop(key)
+        self._bytes -= len(body)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+# implicit tag of every response cache entry
+_ALL_TAGS = "*"
+
+
+def clear_caches() -> None:
+    for cache in _registry:
+        cache.clear()
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    return [cache.stats() for cache in _registry]
+
+
+# serialized schemas.Post / schemas.User by id, for the multi-get endpoints
+post_cache = TTLCache("posts", ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS)
+user_cache = TTLCache("users", ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS)
+
+# auth_helper.Principal by user id, for get_current_user
+principal_cache = TTLCache("principals", PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+# verified JWT claims by sha256 of the token; each entry is set to expire at its exp
+token_cache = TTLCache("tokens", TOKEN_CACHE_SIZE, get_access_token_expires().total_seconds())
+
+# JSON bodies of the public read endpoints, see cached_json()
+response_cache = ResponseCache(
+    "responses", RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS
+)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of a response body: the same bytes get the same tag in every process."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+async def cached_json(
+    key: Hashable,
+    tags: Iterable[str],
+    build: Callable[[], Awaitable[BaseModel]],
+    if_none_match: Optional[str] = None,
+) -> Response:
+    """
+    Serve ``key`` from the response cache, or build, serialize and store it.
+
+    ``build`` is awaited for the response model; anything it raises (e.g. a 404)
+    goes out as usual and nothing is cached. ``tags`` name the data the body depends
+    on and are what the write handlers pass to ``response_cache.invalidate``.
+
+    Every response carries an ETag hashed from its body when it was cached. A
+    request whose If-None-Match still matches gets an empty 304; when the body is
+    cached that costs no query and no serialization at all.
+    """
+    tags = (_ALL_TAGS, *tags)
+    cached = response_cache.get(key)
+    if cached is None:
+        versions = response_cache.versions(tags)
+        body = (await build()).model_dump_json().encode()
+        etag = make_etag(body)
+        response_cache.set(key, body, etag, tags, versions)
+    else:
+        body, etag = cached
+
+    # clients may keep a copy but must revalidate it before every use
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,23 @@
+from typing import Optional
+from urllib.parse import quote_plus
+
+from .. import models
+
+
+def author_avatar(author_name: Optional[str]) -> Optional[str]:
+    if not author_name:
+        return None
+    return f"https://ui-avatars.com/api/?name={quote_plus(author_name)}&background=ddd&color=555&rounded=true"
+
+
+def comment_out(comment: models.Comment, author_name: Optional[str]) -> dict:
+    """Shape a comment as schemas.CommentOut, with its author's name and avatar."""
+    return {
+        "id": comment.id,
+        "content": comment.content,
+        "post_id": comment.post_id,
+        "user_id": comment.user_id,
+        "created_at": comment.created_at,
+        "author_name": author_name,
+        "author_avatar": author_avatar(author_name),
+    }
@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from ..config import (
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_QUEUE_SIZE,
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    PASSWORD_HASH_WORKERS,
+)
+from .stats_helper import LATENCY_WINDOW, percentiles
+
+
+def _timed(fn: Callable, args: Tuple) -> Tuple[Any, float]:
+    """Run ``fn`` in the worker and report how long the work itself took."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _process_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class HashExecutor:
+    """
+    Bounded pool for CPU-bound password hashing, kept apart from the request threads.
+
+    At most ``workers + max_queue`` calls are admitted at a time; past that ``run``
+    fails fast with 503 and a Retry-After header instead of letting a burst of logins
+    queue up behind each other and hold every request thread. ``kind`` is "process"
+    (hashing runs outside the GIL entirely) or "thread" (cheaper to start, and the
+    pbkdf2 implementation releases the GIL anyway). Functions run in a process pool
+    must be module-level so they can be pickled.
+
+    Worker processes are started with forkserver (spawn where that is missing),
+    never fork: the pool is created on the first hash, when request threads, the
+    SQLite writer and the WAL checkpointer are already running, and a forked child
+    can inherit a lock one of them held (logging, the connection pool) and hang.
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int, retry_after: int):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown hash executor kind: {kind!r}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_times: deque = deque(maxlen=LATENCY_WINDOW)
+        self._run_times: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=_process_context()
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hash"
+                    )
+            return self._pool
+
+    def _admit(self, admit: bool) -> None:
+        with self._lock:
+            if admit and self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in attempts in progress, please retry shortly",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._in_flight += 1
+
+    def _done(self, started: float, future: Future) -> None:
+        run_time = None
+        if not future.cancelled() and future.exception() is None:
+            run_time = future.result()[1]
+        with self._lock:
+            self._in_flight -= 1
+            if run_time is not None:
+                self.completed += 1
+                self._run_times.append(run_time)
+                self._wait_times.append(max(0.0, time.perf_counter() - started - run_time))
+
+    def _submit(self, fn: Callable, args: Tuple, admit: bool) -> Future:
+        """
+        Admit and queue ``fn(*args)`` on the pool. The admission slot is given back
+        when the pool is done with the call, not when the caller stops waiting: a
+        cancelled request (the client went away) keeps its slot until its hash
+        leaves the queue or finishes running.
+        """
+        self._admit(admit)
+        started = time.perf_counter()
+        try:
+            future = self._get_pool().submit(_timed, fn, args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(lambda done: self._done(started, done))
+        return future
+
+    async def run(self, fn: Callable, *args, admit: bool = True) -> Any:
+        """
+        Run ``fn(*args)`` on the pool without blocking the event loop.
+
+        ``admit=False`` skips admission control for callers that pace themselves
+        (bulk import); those calls still count towards the queue depth.
+        """
+        result, _ = await asyncio.wrap_future(self._submit(fn, args, admit))
+        return result
+
+    def run_sync(self, fn: Callable, *args) -> Any:
+        """``run`` for sync handlers: the calling thread waits, but the work is bounded."""
+        result, _ = self._submit(fn, args, True).result()
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "hash_ms": percentiles(self._run_times),
+                "wait_ms": percentiles(self._wait_times),
+            }
+
+
+password_executor = HashExecutor(
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    PASSWORD_HASH_QUEUE_SIZE,
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,138 @@
+import asyncio
+import csv
+import json
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from .hash_executor import password_executor
+
+
+# Upload formats accepted by the bulk user import, keyed by Content-Type. CSV and
+# NDJSON are parsed line by line as the body arrives; a JSON array has to be read
+# whole before it can be parsed.
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "json",
+}
+
+# a parsed record, or the reason it could not be parsed
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+def import_format(content_type: Optional[str]) -> str:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    fmt = IMPORT_FORMATS.get(media_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Upload must be one of: {', '.join(IMPORT_FORMATS)}",
+        )
+    return fmt
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Record]:
+    """
+    Yield ``(line, record, error)`` for every record of an upload.
+
+    ``line`` is the 1-based line number (the item position for a JSON array). Blank
+    lines are skipped. CSV needs a header row; quoted fields spanning lines are not
+    supported since the body is split on newlines before it reaches the CSV parser.
+    """
+    if fmt == "json":
+        body = b"".join([chunk async for chunk in chunks])
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON")
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array"
+            )
+        for position, item in enumerate(items, start=1):
+            if isinstance(item, dict):
+                yield position, item, None
+            else:
+                yield position, None, "Expected an object"
+        return
+
+    header = None
+    line_no = 0
+    async for raw in _iter_lines(chunks):
+        line_no += 1
+        try:
+            line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8").rstrip("\r")
+        except UnicodeDecodeError:
+            yield line_no, None, "Line is not valid UTF-8"
+            continue
+        if not line.strip():
+            continue
+
+        if fmt == "ndjson":
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield line_no, None, "Invalid JSON"
+                continue
+            if isinstance(item, dict):
+                yield line_no, item, None
+            else:
+                yield line_no, None, "Expected an object"
+            continue
+
+        fields = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip().lower() for name in fields]
+            continue
+        if len(fields) != len(header):
+            yield line_no, None, f"Expected {len(header)} fields, got {len(fields)}"
+            continue
+        # empty cells are left out so model defaults (e.g. role) apply
+        yield line_no, {k: v for k, v in zip(header, fields) if v != ""}, None
+
+
+# ---- password hashing ------------------------------------------------------------
+
+# passwords per pool task; small enough that a login never waits long behind an import
+HASH_CHUNK_SIZE = 16
+
+
+def _hash_many(hash_fn: Callable[[str], str], passwords: List[str]) -> List[str]:
+    return [hash_fn(password) for password in passwords]
+
+
+async def hash_passwords(hash_fn: Callable[[str], str], passwords: List[str]) -> List[str]:
+    """
+    Hash ``passwords`` on the shared password executor, keeping order.
+
+    Work goes out in HASH_CHUNK_SIZE chunks with at most one chunk per worker in
+    flight, so an import uses every core without starving concurrent logins.
+    ``hash_fn`` must be a module-level function so process workers can unpickle it.
+    """
+    executor = password_executor
+    gate = asyncio.Semaphore(executor.workers)
+
+    async def hash_chunk(chunk: List[str]) -> List[str]:
+        async with gate:
+            return await executor.run(_hash_many, hash_fn, chunk, admit=False)
+
+    chunks = await asyncio.gather(
+        *(
+            hash_chunk(passwords[start:start + HASH_CHUNK_SIZE])
+            for start in range(0, len(passwords), HASH_CHUNK_SIZE)
+        )
+    )
+    return [hashed for chunk in chunks for hashed in chunk]
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.orm import Query, Session
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque url-safe token."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _keyset_value(db: Session, value: datetime):
+    # SQLite keeps server_default timestamps as "YYYY-MM-DD HH:MM:SS" text while
+    # SQLAlchemy binds datetimes with a ".ffffff" suffix, so a bound datetime never
+    # compares equal to a stored one. Compare against the stored text form instead.
+    if db.get_bind().dialect.name == "sqlite":
+        return literal(value.replace(tzinfo=None).isoformat(sep=" "), String)
+    return value
+
+
+def keyset_page(
+    db: Session,
+    query: Query,
+    created_col,
+    id_col,
+    key: Callable[[Any], Tuple[datetime, int]],
+    limit: int,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    descending: bool = True,
+) -> Tuple[List[Any], Optional[str], Optional[str]]:
+    """
+    Fetch one page of ``query`` ordered by (created_at, id).
+
+    ``after`` continues past the last row of a page, ``before`` walks back from the
+    first row of a page. Returns the rows plus the cursors for the neighbouring
+    pages (None when there is nothing further in that direction).
+    """
+    if after and before:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either 'after' or 'before', not both",
+        )
+
+    # walking backwards is the same scan in the opposite direction
+    backwards = before is not None
+    forward_desc = descending != backwards
+
+    cursor = after or before
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        value = _keyset_value(db, created_at)
+        if forward_desc:
+            query = query.filter(
+                or_(created_col < value, and_(created_col == value, id_col < row_id))
+            )
+        else:
+            query = query.filter(
+                or_(created_col > value, and_(created_col == value, id_col > row_id))
+            )
+
+    if forward_desc:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+
+    # one extra row tells us whether another page exists without a COUNT(*)
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if backwards:
+        rows.reverse()
+
+    first = encode_cursor(*key(rows[0])) if rows else None
+    last = encode_cursor(*key(rows[-1])) if rows else None
+
+    if backwards:
+        next_cursor = last
+        prev_cursor = first if has_more else None
+    else:
+        next_cursor = last if has_more else None
+        prev_cursor = first if after else None
+
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,119 @@
+import argparse
+import os
+import statistics
+import time
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+from passlib.hash import pbkdf2_sha256
+
+from ..config import PASSWORD_HASH_ROUNDS
+
+
+def _build_context(rounds: int) -> CryptContext:
+    """
+    The one CryptContext every password goes through.
+
+    With ``rounds`` set, hashes made with any other round count are reported by
+    ``needs_update``, so login rehashes them (see ``verify_and_update``) and the cost
+    can be tuned up or down without forcing password resets. 0 keeps passlib's
+    default and never asks for a rehash.
+    """
+    if not rounds:
+        return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+
+pwd_context = _build_context(PASSWORD_HASH_ROUNDS)
+
+
+# The functions below are module-level so the password executor can run them in a
+# process pool.
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password and, when it matches a hash made with outdated settings, also
+    return a fresh hash of it to store in place of the old one.
+
+    Returns ``(matched, new_hash)``; ``new_hash`` is None unless a rehash is due.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# ---- calibration ------------------------------------------------------------------
+#
+#   python -m app.utils.password_helper --target-ms 250
+#
+# prints the PASSWORD_HASH_ROUNDS that makes one hash take about --target-ms on this
+# machine, to be run on the hardware the API is deployed on.
+
+# round counts are rounded to this, and never go below the first value
+ROUNDS_STEP = 1000
+MIN_ROUNDS = 10000
+
+
+def time_hash(rounds: int, samples: int = 5) -> float:
+    """Median seconds one pbkdf2_sha256 hash takes at ``rounds`` on this machine."""
+    handler = pbkdf2_sha256.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash("calibration-password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int = 5) -> Tuple[int, float]:
+    """
+    Find the round count whose hash takes about ``target_ms``.
+
+    pbkdf2 cost is linear in its rounds, so one probe gives an estimate that two more
+    measurements refine. Returns ``(rounds, measured_ms)``.
+    """
+    rounds = MIN_ROUNDS
+    for _ in range(3):
+        elapsed = time_hash(rounds, samples)
+        estimate = rounds * target_ms / 1000 / elapsed
+        rounds = max(MIN_ROUNDS, int(round(estimate / ROUNDS_STEP)) * ROUNDS_STEP)
+    return rounds, time_hash(rounds, samples) * 1000
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.utils.password_helper",
+        description="Benchmark pbkdf2_sha256 rounds against a target hashing latency.",
+    )
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="desired time for one hash (and so one login), in ms")
+    parser.add_argument("--samples", type=int, default=5,
+                        help="hashes timed per measurement; the median is used")
+    args = parser.parse_args(argv)
+
+    current = PASSWORD_HASH_ROUNDS or pbkdf2_sha256.default_rounds
+    current_ms = time_hash(current, args.samples) * 1000
+    rounds, measured_ms = calibrate(args.target_ms, args.samples)
+    cores = os.cpu_count() or 1
+
+    print(f"current:   {current} rounds, {current_ms:.1f} ms per hash")
+    print(f"suggested: {rounds} rounds, {measured_ms:.1f} ms per hash")
+    print(f"           about {cores * 1000 / measured_ms:.0f} logins/s with one hashing worker per core ({cores})")
+    print()
+    print(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
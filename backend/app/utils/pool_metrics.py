@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+from .stats_helper import LATENCY_WINDOW, percentiles
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that times every checkout, i.e. how long a request waited for a
+    connection, including opening a new one, and counts checkouts that gave up after
+    pool_timeout. Results go to the pool's ``metrics`` once instrument() has run.
+    """
+
+    metrics: "PoolMetrics" = None
+
+    def connect(self):
+        if self.metrics is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception as exc:
+            self.metrics.record_failure(exc)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # dispose() swaps in a new pool made here; keep reporting to the same metrics
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+
+class PoolMetrics:
+    """
+    Counters kept by pool event listeners on one engine: connections opened (and
+    how many of those were overflow), checkouts, checkins, invalidations, the
+    high-water mark of checked-out connections, plus checkout waits and timeouts
+    when the engine uses TimedQueuePool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self.settings: Dict[str, Any] = {}
+        self.connects = 0
+        self.overflow_connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.max_checked_out = 0
+        self._waits: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def instrument(self, engine: Engine, settings: Dict[str, Any]) -> None:
+        """Attach to ``engine``; ``settings`` are the pool options, echoed in stats()."""
+        self._engine = engine
+        self.settings = settings
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = self
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        # QueuePool counts a new connection against overflow before opening it
+        overflow = getattr(self._engine.pool, "overflow", lambda: 0)() > 0
+        with self._lock:
+            self.connects += 1
+            if overflow:
+                self.overflow_connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_out = getattr(self._engine.pool, "checkedout", lambda: 0)()
+        with self._lock:
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._waits.append(seconds)
+
+    def record_failure(self, exc: Exception) -> None:
+        with self._lock:
+            if isinstance(exc, PoolTimeout):
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self._engine.pool if self._engine is not None else None
+        current = {}
+        if isinstance(pool, QueuePool):
+            current = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            }
+        with self._lock:
+            return {
+                "pool": type(pool).__name__ if pool is not None else None,
+                "settings": self.settings,
+                **current,
+                "max_checked_out": self.max_checked_out,
+                "connects": self.connects,
+                "overflow_connects": self.overflow_connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "checkout_ms": percentiles(self._waits),
+            }
@@ -0,0 +1,143 @@
+import functools
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+# Statement-level instrumentation in place of the engine's echo=True: every
+# statement is timed between before_cursor_execute and after_cursor_execute and
+# added to an aggregate for its fingerprint (the SQL with literals, placeholders and
+# repeated VALUES / IN lists normalized away). Only statements over the threshold
+# and a random sample of the rest are logged, as one JSON object per line and
+# without their parameters.
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_GROUP = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+_WHITESPACE = re.compile(r"\s+")
+
+# statements past this many distinct fingerprints are aggregated under OTHER
+MAX_FINGERPRINTS = 1000
+OTHER = "<other>"
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Normalize ``statement`` so every execution of the same query shape maps to one
+    string: literals and placeholders become ``?``, ``IN (?, ?, ?)`` becomes
+    ``IN (?+)`` and repeated ``VALUES`` rows collapse to one.
+    """
+    normalized = _STRING.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    normalized = _IN_LIST.sub("(?+)", normalized)
+    return _REPEATED_GROUP.sub(r"\1, ...", normalized)
+
+
+def fingerprint_id(fingerprint: str) -> str:
+    return hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+
+
+class QueryLog:
+    """
+    Times the statements of the engines it is attached to. Statements taking at
+    least ``threshold_ms`` are logged at WARNING, a ``sample_rate`` fraction of the
+    others at INFO, and all of them are counted per fingerprint (see stats()).
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        # fingerprint -> [count, total seconds, max seconds, slow count]
+        self._aggregates: Dict[str, List[float]] = {}
+
+    def instrument(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._on_error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_log_starts", []).append(time.perf_counter())
+
+    def _on_error(self, exception_context) -> None:
+        # a failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_log_starts"):
+            conn.info["query_log_starts"].pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_log_starts"].pop()
+        shape = fingerprint(statement)
+        slow = elapsed >= self.threshold
+        self._aggregate(shape, elapsed, slow)
+
+        if slow:
+            self._log(logging.WARNING, "slow_query", shape, elapsed, cursor, executemany)
+        elif self.sample_rate and random.random() < self.sample_rate:
+            self._log(logging.INFO, "sampled_query", shape, elapsed, cursor, executemany)
+
+    def _aggregate(self, shape: str, elapsed: float, slow: bool) -> None:
+        with self._lock:
+            entry = self._aggregates.get(shape)
+            if entry is None:
+                if len(self._aggregates) >= MAX_FINGERPRINTS:
+                    shape = OTHER
+                entry = self._aggregates.setdefault(shape, [0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+            entry[3] += slow
+
+    def _log(self, level: int, kind: str, shape: str, elapsed: float, cursor, executemany) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            "event": kind,
+            "fingerprint_id": fingerprint_id(shape),
+            "duration_ms": round(elapsed * 1000, 3),
+            "rows": getattr(cursor, "rowcount", -1),
+            "executemany": executemany,
+            "statement": shape,
+        }
+        logger.log(level, json.dumps(record))
+
+    def stats(self, limit: int = 50) -> Dict[str, Any]:
+        """The ``limit`` fingerprints with the most total time spent in the database."""
+        with self._lock:
+            rows = sorted(self._aggregates.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "sample_rate": self.sample_rate,
+            "fingerprints": len(rows),
+            "queries": [
+                {
+                    "fingerprint_id": fingerprint_id(shape),
+                    "statement": shape,
+                    "count": count,
+                    "total_ms": round(total * 1000, 3),
+                    "mean_ms": round(total * 1000 / count, 3),
+                    "max_ms": round(longest * 1000, 3),
+                    "slow": slow,
+                }
+                for shape, (count, total, longest, slow) in rows[:limit]
+            ],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._aggregates.clear()
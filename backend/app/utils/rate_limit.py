@@ -0,0 +1,218 @@
+import math
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from ..config import (
+    LOGIN_EMAIL_BURST,
+    LOGIN_EMAIL_RATE_PER_MINUTE,
+    LOGIN_IP_BURST,
+    LOGIN_IP_RATE_PER_MINUTE,
+    RATE_LIMIT_SQLITE_PATH,
+    RATE_LIMIT_STORAGE,
+)
+
+
+# A bucket untouched for this long is dropped from storage. It must exceed the time
+# any bucket takes to refill completely (burst / rate), since a dropped bucket comes
+# back full.
+IDLE_SECONDS = 3600
+
+
+def _take(
+    level: Optional[Tuple[float, float]], now: float, rate: float, burst: float
+) -> Tuple[Tuple[float, float], float]:
+    """
+    Refill a bucket stored as ``(tokens, updated)`` up to ``now`` and try to take
+    one token from it. Returns the new level and how long the caller has to wait
+    (0 when the token was taken).
+    """
+    if level is None:
+        tokens = burst
+    else:
+        tokens = min(burst, level[0] + (now - level[1]) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class BucketStore(ABC):
+    """
+    Where token bucket levels live. ``take`` must refill and debit a key atomically,
+    also against other processes when the store is shared between them.
+    ``blocking`` stores may wait on I/O or a lock held by another process.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token for ``key``; return 0, or the seconds until one is available."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every bucket."""
+
+
+class MemoryBucketStore(BucketStore):
+    """
+    Buckets in this process's memory, spread over lock-protected shards so
+    concurrent logins for different keys rarely wait on each other. Each shard is
+    kept in least-recently-used order and bounded, so a spray of made-up emails
+    cannot grow it without limit.
+    """
+
+    def __init__(self, shards: int = 16, max_keys: int = 100_000, idle_seconds: float = IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._max_per_shard = max(1, max_keys // shards)
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        lock, buckets = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            level, wait = _take(buckets.get(key), now, rate, burst)
+            buckets[key] = level
+            buckets.move_to_end(key)
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if len(buckets) <= self._max_per_shard and now - oldest[1] < self.idle_seconds:
+                    break
+                buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Buckets in a local SQLite file, so every worker process on the host shares them.
+    Each take is one short write transaction; idle rows are pruned now and then.
+    """
+
+    blocking = True
+
+    # takes between two prunes of idle rows
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, idle_seconds: float = IDLE_SECONDS):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._takes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode, transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        conn = self._connection()
+        # wall clock, since other processes read the same rows
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            (tokens, updated), wait = _take(row, now, rate, burst)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, updated),
+            )
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_seconds,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM buckets")
+
+
+class TokenBucketLimiter:
+    """
+    Allows ``per_minute`` hits per key on average, and bursts of up to ``burst``.
+    A ``per_minute`` of 0 turns the limiter off.
+    """
+
+    def __init__(self, name: str, store: BucketStore, per_minute: float, burst: float):
+        self.name = name
+        self.store = store
+        self.rate = per_minute / 60
+        self.burst = max(1.0, burst)
+
+    def hit(self, key: str) -> float:
+        """Count a hit for ``key``; return 0, or the seconds to wait before retrying."""
+        if self.rate <= 0:
+            return 0.0
+        return self.store.take(f"{self.name}:{key}", self.rate, self.burst)
+
+
+def make_store(kind: str) -> BucketStore:
+    if kind == "memory":
+        return MemoryBucketStore()
+    if kind == "sqlite":
+        return SQLiteBucketStore(RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unknown rate limit storage: {kind!r}")
+
+
+_store = make_store(RATE_LIMIT_STORAGE)
+login_ip_limiter = TokenBucketLimiter("login-ip", _store, LOGIN_IP_RATE_PER_MINUTE, LOGIN_IP_BURST)
+login_email_limiter = TokenBucketLimiter(
+    "login-email", _store, LOGIN_EMAIL_RATE_PER_MINUTE, LOGIN_EMAIL_BURST
+)
+
+
+def check_login_rate(request: Request, email: str) -> None:
+    """
+    Count a login attempt against the client's IP and the submitted email, and
+    answer 429 with Retry-After when either is over its limit.
+
+    The IP is the direct peer's; behind a proxy, run uvicorn with
+    --proxy-headers so that is the real client.
+    """
+    ip = request.client.host if request.client else "unknown"
+    wait = login_ip_limiter.hit(ip) or login_email_limiter.hit(email.strip().lower())
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please retry later",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+async def check_login_rate_async(request: Request, email: str) -> None:
+    """
+    check_login_rate for async handlers. A blocking store is consulted from the
+    threadpool, so a login flood waiting on its lock never stalls the event loop;
+    the in-memory store only takes a shard lock briefly and is checked inline.
+    """
+    if _store.blocking:
+        await run_in_threadpool(check_login_rate, request, email)
+    else:
+        check_login_rate(request, email)
+
+
+def reset_rate_limits() -> None:
+    _store.clear()
@@ -0,0 +1,482 @@
+import html
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import DateTime, Integer, String, Text, bindparam, column, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import BM25_INDEX_DIR, BM25_SYNC_SECONDS, SEARCH_BACKEND
+from .bm25_index import BM25Index, claim_directory, tokenize
+from .text_helper import highlight_snippet
+
+logger = logging.getLogger(__name__)
+
+
+# Full-text search over posts (and comments), served by one of two backends.
+#
+# Database-native:
+#   SQLite: a standalone FTS5 table ``posts_fts`` whose rowid is the post id, kept in
+#           sync explicitly by the post handlers (index_post / remove_post).
+#   PostgreSQL: a stored generated ``search_vector`` tsvector column with a GIN index,
+#           so the database keeps it in sync on every write by itself.
+#
+# In-process BM25 (see bm25_index.py), for databases without a full-text index. The
+# handlers' index_* / remove_* calls are queued on the session and applied to the
+# in-memory indexes only once the transaction commits.
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+# FTS5 and ts_headline cut snippets from raw post content, so they mark matches with
+# these control characters instead; _markup escapes the snippet as HTML and only then
+# turns them into SNIPPET_START / SNIPPET_END
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+
+_SQLITE_CREATE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts "
+    "USING fts5(title, content, tokenize='porter unicode61')"
+)
+_SQLITE_DROP_FTS = "DROP TABLE IF EXISTS posts_fts"
+
+_PG_ADD_SEARCH_VECTOR = (
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+    ") STORED"
+)
+_PG_CREATE_SEARCH_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)"
+)
+
+_SQLITE_SEARCH = text(
+    """
+    SELECT p.id, p.title, p.owner_id, p.created_at,
+           snippet(posts_fts, 1, :match_start, :match_end, '...', 24) AS snippet,
+           -bm25(posts_fts, 10.0, 1.0) AS rank
+    FROM posts_fts JOIN posts p ON p.id = posts_fts.rowid
+    WHERE posts_fts MATCH :q
+    ORDER BY bm25(posts_fts, 10.0, 1.0), p.id DESC
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+# rank and page in the inner query so ts_headline only runs on the returned rows
+_PG_SEARCH = text(
+    """
+    SELECT hits.id, hits.title, hits.owner_id, hits.created_at, hits.rank,
+           ts_headline('english', hits.content, hits.query, :headline_options) AS snippet
+    FROM (
+        SELECT p.id, p.title, p.content, p.owner_id, p.created_at, query,
+               ts_rank_cd(p.search_vector, query) AS rank
+        FROM posts p, websearch_to_tsquery('english', :q) AS query
+        WHERE p.search_vector @@ query
+        ORDER BY rank DESC, p.id DESC
+        LIMIT :limit OFFSET :offset
+    ) AS hits
+    ORDER BY hits.rank DESC, hits.id DESC
+    """
+)
+
+_PG_HEADLINE_OPTIONS = f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxFragments=2"
+
+_fts5_available = {}
+
+
+class SearchUnavailable(Exception):
+    """Raised when this deployment has no search backend for what was asked."""
+
+
+def _sqlite_has_fts5(connection: Connection) -> bool:
+    engine = connection.engine
+    if engine not in _fts5_available:
+        options = connection.exec_driver_sql("PRAGMA compile_options").scalars().all()
+        _fts5_available[engine] = "ENABLE_FTS5" in options
+    return _fts5_available[engine]
+
+
+def create_search_index(target, connection: Connection, **kw) -> None:
+    """``after_create`` hook for the posts table."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite" and _sqlite_has_fts5(connection):
+        connection.exec_driver_sql(_SQLITE_CREATE_FTS)
+    elif dialect == "postgresql":
+        connection.exec_driver_sql(_PG_ADD_SEARCH_VECTOR)
+        connection.exec_driver_sql(_PG_CREATE_SEARCH_INDEX)
+
+
+def drop_search_index(target, connection: Connection, **kw) -> None:
+    """``before_drop`` hook for the posts table."""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(_SQLITE_DROP_FTS)
+
+
+def search_backend(db: Session) -> Optional[str]:
+    """Name of the native full-text backend behind ``db``, or None if there is none."""
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return "postgresql"
+    if dialect == "sqlite" and isinstance(bind, Engine):
+        if bind not in _fts5_available:
+            with bind.connect() as connection:
+                _sqlite_has_fts5(connection)
+        if _fts5_available[bind]:
+            return "sqlite"
+    return None
+
+
+# ---- in-process BM25 indexes ---------------------------------------------------
+
+post_index: Optional[BM25Index] = None
+comment_index: Optional[BM25Index] = None
+
+_PENDING_KEY = "bm25_pending"
+
+# rows fetched per round trip when building an index from the database
+_BUILD_BATCH_SIZE = 1000
+
+# the index directory claimed by this process, held until shutdown_search()
+_index_lock = None
+
+# Each index is only told about writes made by its own process. Another worker's
+# writes (or out-of-band ones) are picked up through the index's watermark, the
+# latest updated_at it has seen: rows changed since then, or with an id past the
+# highest indexed one, are (re)indexed at startup and every BM25_SYNC_SECONDS while
+# running. The watermark is saved with the index, so edits made while a worker was
+# down reach it on restart. At startup a row count that still differs rebuilds the
+# index; while running, rows deleted elsewhere are dropped from the index when a
+# search comes across them.
+_SOURCES = {
+    "posts": "SELECT id, content, title, updated_at FROM posts",
+    "comments": "SELECT id, content, '', updated_at FROM comments",
+}
+_last_sync = {}
+_sync_lock = threading.Lock()
+
+
+def _engine_has_native_search(engine: Engine) -> bool:
+    if engine.dialect.name == "postgresql":
+        return True
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            return _sqlite_has_fts5(connection)
+    return False
+
+
+def _later(watermark: Optional[str], updated_at) -> Optional[str]:
+    """The later of a watermark and a row's updated_at, as a watermark."""
+    if updated_at is None:
+        return watermark
+    if isinstance(updated_at, str):
+        # SQLite returns the stored text
+        updated_at = datetime.fromisoformat(updated_at)
+    if watermark is None or updated_at > datetime.fromisoformat(watermark):
+        return updated_at.isoformat(sep=" ")
+    return watermark
+
+
+def _changed_since(db: Session, watermark: str):
+    # look back one sync interval, for clock skew between workers and transactions
+    # that commit a while after taking their timestamp
+    since = datetime.fromisoformat(watermark) - timedelta(seconds=BM25_SYNC_SECONDS)
+    # SQLite keeps the timestamps as "YYYY-MM-DD HH:MM:SS" text, compare them as text
+    if db.get_bind().dialect.name == "sqlite":
+        return since.replace(tzinfo=None).isoformat(sep=" ")
+    return since
+
+
+def _catch_up(db: Session, index: BM25Index, table: str) -> int:
+    """
+    (Re)index the rows of ``table`` changed since the index's watermark or past its
+    highest id; returns how many.
+    """
+    condition = "id > :after"
+    params = {"after": index.max_doc_id}
+    if index.watermark is not None:
+        condition += " OR updated_at >= :since"
+        params["since"] = _changed_since(db, index.watermark)
+    rows = db.execute(
+        text(f"{_SOURCES[table]} WHERE {condition} ORDER BY id").execution_options(
+            yield_per=_BUILD_BATCH_SIZE
+        ),
+        params,
+    )
+    watermark = index.watermark
+    added = 0
+    for doc_id, content, title, updated_at in rows:
+        index.add(doc_id, content, title)
+        watermark = _later(watermark, updated_at)
+        added += 1
+    index.watermark = watermark
+    return added
+
+
+def _sync_index(db: Session, index: BM25Index, table: str, loaded: bool) -> None:
+    _last_sync[table] = time.monotonic()
+    if loaded:
+        added = _catch_up(db, index, table)
+        count = db.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        if count == len(index):
+            if added:
+                logger.info("Indexed %d %s changed since the BM25 snapshot", added, table)
+            return
+        logger.info(
+            "BM25 %s index is out of date (%d rows, %d indexed), rebuilding", table, count, len(index)
+        )
+    else:
+        logger.info("Building BM25 %s index from the database", table)
+    rows = db.execute(text(_SOURCES[table]).execution_options(yield_per=_BUILD_BATCH_SIZE))
+    watermark = None
+
+    def docs():
+        nonlocal watermark
+        for doc_id, content, title, updated_at in rows:
+            watermark = _later(watermark, updated_at)
+            yield doc_id, content, title
+
+    index.build(docs())
+    index.watermark = watermark
+
+
+def _maybe_catch_up(db: Session, index: BM25Index, table: str) -> None:
+    if time.monotonic() - _last_sync.get(table, 0.0) < BM25_SYNC_SECONDS:
+        return
+    # one request does the catch-up, the others search what is there
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        _catch_up(db, index, table)
+        _last_sync[table] = time.monotonic()
+        # end this read so the row lookup after ranking sees every indexed row
+        db.commit()
+    finally:
+        _sync_lock.release()
+
+
+def init_search(engine: Engine, session_factory: sessionmaker) -> None:
+    """Pick the search backend at startup and load (or build) the BM25 indexes if needed."""
+    global post_index, comment_index, _index_lock
+    backend = SEARCH_BACKEND
+    if backend == "auto":
+        backend = "native" if _engine_has_native_search(engine) else "bm25"
+    if backend != "bm25":
+        return
+
+    directory, _index_lock = claim_directory(BM25_INDEX_DIR)
+    post_index = BM25Index(os.path.join(directory, "posts"))
+    comment_index = BM25Index(os.path.join(directory, "comments"))
+    with session_factory() as db:
+        _sync_index(db, post_index, "posts", post_index.load())
+        _sync_index(db, comment_index, "comments", comment_index.load())
+
+
+def shutdown_search() -> None:
+    global post_index, comment_index, _index_lock
+    for index in (post_index, comment_index):
+        if index is not None:
+            index.close()
+    post_index = comment_index = None
+    _last_sync.clear()
+    if _index_lock is not None:
+        _index_lock.close()
+        _index_lock = None
+
+
+def _defer(db: Session, method, *args) -> None:
+    db.info.setdefault(_PENDING_KEY, []).append((method, args))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for method, args in session.info.pop(_PENDING_KEY, ()):
+        method(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ---- index maintenance (called by the routers) ----------------------------------
+
+def index_post(db: Session, post) -> None:
+    """Add or refresh ``post`` in the index, as part of the caller's transaction."""
+    if post_index is not None:
+        _defer(db, post_index.add, post.id, post.content, post.title)
+        return
+    if search_backend(db) != "sqlite":
+        return
+    db.execute(text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post.id})
+    db.execute(
+        text("INSERT INTO posts_fts (rowid, title, content) VALUES (:id, :title, :content)"),
+        {"id": post.id, "title": post.title, "content": post.content},
+    )
+
+
+def index_posts(db: Session, posts: List[dict]) -> None:
+    """Bulk variant of index_post for freshly inserted posts (dicts with id, title, content)."""
+    if not posts:
+        return
+    if post_index is not None:
+        for post in posts:
+            _defer(db, post_index.add, post["id"], post["content"], post["title"])
+        return
+    if search_backend(db) != "sqlite":
+        return
+    db.execute(
+        text("INSERT INTO posts_fts (rowid, title, content) VALUES (:id, :title, :content)"),
+        [{"id": p["id"], "title": p["title"], "content": p["content"]} for p in posts],
+    )
+
+
+def remove_post(db: Session, post_id: int) -> None:
+    """Drop a post, and the comments that cascade with it, from the index."""
+    if post_index is not None:
+        _defer(db, post_index.remove, post_id)
+        comment_ids = db.execute(
+            text("SELECT id FROM comments WHERE post_id = :post_id"), {"post_id": post_id}
+        ).scalars().all()
+        for comment_id in comment_ids:
+            _defer(db, comment_index.remove, comment_id)
+        return
+    if search_backend(db) != "sqlite":
+        return
+    db.execute(text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post_id})
+
+
+def index_comment(db: Session, comment) -> None:
+    if comment_index is not None:
+        _defer(db, comment_index.add, comment.id, comment.content)
+
+
+def remove_comment(db: Session, comment_id: int) -> None:
+    if comment_index is not None:
+        _defer(db, comment_index.remove, comment_id)
+
+
+def remove_user_content(db: Session, user_id: int) -> None:
+    """Drop everything that cascades with a deleted user: their posts and comments."""
+    if post_index is not None:
+        post_ids = db.execute(
+            text("SELECT id FROM posts WHERE owner_id = :user_id"), {"user_id": user_id}
+        ).scalars().all()
+        comment_ids = db.execute(
+            text(
+                "SELECT id FROM comments WHERE user_id = :user_id "
+                "OR post_id IN (SELECT id FROM posts WHERE owner_id = :user_id)"
+            ),
+            {"user_id": user_id},
+        ).scalars().all()
+        for post_id in post_ids:
+            _defer(db, post_index.remove, post_id)
+        for comment_id in comment_ids:
+            _defer(db, comment_index.remove, comment_id)
+        return
+    if search_backend(db) != "sqlite":
+        return
+    db.execute(
+        text("DELETE FROM posts_fts WHERE rowid IN (SELECT id FROM posts WHERE owner_id = :user_id)"),
+        {"user_id": user_id},
+    )
+
+
+def _fts5_query(q: str) -> str:
+    # quote every term so user input can never be parsed as FTS5 query syntax;
+    # adjacent quoted strings are an implicit AND
+    terms = re.findall(r"\w+", q)
+    return " ".join(f'"{term}"' for term in terms)
+
+
+_POSTS_BY_ID = (
+    text("SELECT id, title, content, owner_id, created_at FROM posts WHERE id IN :ids")
+    .bindparams(bindparam("ids", expanding=True))
+    .columns(
+        column("id", Integer),
+        column("title", String),
+        column("content", Text),
+        column("owner_id", Integer),
+        column("created_at", DateTime(timezone=True)),
+    )
+)
+
+_COMMENTS_BY_ID = (
+    text("SELECT id, content, post_id, user_id, created_at FROM comments WHERE id IN :ids")
+    .bindparams(bindparam("ids", expanding=True))
+    .columns(
+        column("id", Integer),
+        column("content", Text),
+        column("post_id", Integer),
+        column("user_id", Integer),
+        column("created_at", DateTime(timezone=True)),
+    )
+)
+
+
+def _bm25_hits(
+    db: Session, index: BM25Index, table: str, by_id, q: str, limit: int, offset: int
+) -> List[dict]:
+    _maybe_catch_up(db, index, table)
+    # rank in memory, then fetch just this page's rows by primary key
+    ranked = index.search(q, limit=limit, offset=offset)
+    if not ranked:
+        return []
+    rows = {row.id: row for row in db.execute(by_id, {"ids": [doc_id for doc_id, _ in ranked]})}
+    terms = tokenize(q)
+    hits = []
+    for doc_id, score in ranked:
+        row = rows.get(doc_id)
+        if row is None:
+            # deleted by another process
+            index.remove(doc_id)
+            continue
+        hit = dict(row._mapping)
+        hit["snippet"] = highlight_snippet(hit.pop("content"), terms, SNIPPET_START, SNIPPET_END)
+        hit["rank"] = score
+        hits.append(hit)
+    return hits
+
+
+def _markup(snippet: str) -> str:
+    escaped = html.escape(snippet)
+    return escaped.replace(_MATCH_START, SNIPPET_START).replace(_MATCH_END, SNIPPET_END)
+
+
+def _marked_up(rows) -> List[dict]:
+    return [{**row._mapping, "snippet": _markup(row.snippet or "")} for row in rows]
+
+
+def search_posts(db: Session, q: str, limit: int, offset: int) -> List:
+    """
+    Ranked post hits with highlighted snippets, best match first.
+
+    Snippets are HTML: the post text in them is escaped, matches are wrapped in
+    SNIPPET_START / SNIPPET_END.
+    """
+    if post_index is not None:
+        return _bm25_hits(db, post_index, "posts", _POSTS_BY_ID, q, limit, offset)
+    backend = search_backend(db)
+    params = {"limit": limit, "offset": offset}
+    if backend == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return []
+        params.update(match_start=_MATCH_START, match_end=_MATCH_END)
+        return _marked_up(db.execute(_SQLITE_SEARCH, {"q": match, **params}))
+    if backend == "postgresql":
+        params["headline_options"] = _PG_HEADLINE_OPTIONS
+        return _marked_up(db.execute(_PG_SEARCH, {"q": q, **params}))
+    raise SearchUnavailable(f"No full-text search backend for {db.get_bind().dialect.name}")
+
+
+def search_comments(db: Session, q: str, limit: int, offset: int) -> List:
+    """Ranked comment hits; only the BM25 backend indexes comments."""
+    if comment_index is None:
+        raise SearchUnavailable("Comment search requires the BM25 search backend")
+    return _bm25_hits(db, comment_index, "comments", _COMMENTS_BY_ID, q, limit, offset)
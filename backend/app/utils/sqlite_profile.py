@@ -0,0 +1,98 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+# Production settings for a file-based SQLite database, applied to every new
+# connection:
+#
+# - journal_mode=WAL: readers work on a snapshot and no longer wait for a writer
+#   (and the writer not for them); only writers still take turns
+# - synchronous=NORMAL: in WAL mode this is still safe against corruption, a power
+#   loss can only drop the last commits; it saves an fsync per commit
+# - mmap_size / cache_size: serve reads from memory-mapped pages and a larger page
+#   cache (a negative cache_size is in KiB) instead of read() calls
+# - busy_timeout: a writer that finds the database locked retries for this many ms
+#   instead of failing with "database is locked" right away
+# - temp_store=MEMORY: sorts and temporary indexes stay off disk
+
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+
+def apply_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Run ``PRAGMA name=value`` for each of ``pragmas`` on every new connection."""
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+class WalCheckpointer:
+    """
+    Checkpoints the WAL of ``engine`` every ``interval`` seconds from a background
+    thread.
+
+    SQLite checkpoints on its own once the WAL passes wal_autocheckpoint pages, but
+    only from inside a committing writer, and a checkpoint cannot complete while a
+    reader still uses an old snapshot, so under steady traffic the WAL can keep
+    growing. A PASSIVE checkpoint on a timer copies back whatever it can without
+    waiting for anyone; stop() ends with a TRUNCATE checkpoint that empties the file.
+    """
+
+    def __init__(self, engine: Engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.checkpoints = 0
+        self.last_result: Optional[Dict[str, int]] = None
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Dict[str, int]:
+        with self.engine.connect() as connection:
+            busy, log_pages, checkpointed = connection.exec_driver_sql(
+                f"PRAGMA wal_checkpoint({mode})"
+            ).one()
+        self.checkpoints += 1
+        self.last_result = {"busy": busy, "log_pages": log_pages, "checkpointed": checkpointed}
+        return self.last_result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception:
+                logger.exception("WAL checkpoint failed")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="wal-checkpoint", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            try:
+                self.checkpoint("TRUNCATE")
+            except Exception:
+                logger.exception("Final WAL checkpoint failed")
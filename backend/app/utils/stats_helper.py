@@ -0,0 +1,17 @@
+from typing import Dict, Iterable, Optional
+
+
+# latency samples kept per metric for the percentiles reported by the admin endpoints
+LATENCY_WINDOW = 1000
+
+
+def percentiles(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    """p50 / p95 / max of latencies in seconds, reported in milliseconds."""
+    samples = sorted(samples)
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": round(samples[len(samples) // 2] * 1000, 3),
+        "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "max": round(samples[-1] * 1000, 3),
+    }
@@ -0,0 +1,51 @@
+import html
+import re
+
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(text: str, max_length: int = EXCERPT_LENGTH) -> str:
+    """Collapse whitespace and cut ``text`` at a word boundary near ``max_length``."""
+    collapsed = " ".join(text.split())
+    if len(collapsed) <= max_length:
+        return collapsed
+    cut = collapsed[:max_length].rsplit(" ", 1)[0] or collapsed[:max_length]
+    return cut + "..."
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def highlight_snippet(
+    text: str,
+    terms,
+    start: str = "<mark>",
+    end: str = "</mark>",
+    width: int = 160,
+) -> str:
+    """
+    Cut a window of ``text`` around the first matched term and wrap every match.
+
+    The result is HTML: the text itself is escaped, only ``start`` / ``end`` are not.
+    """
+    collapsed = " ".join(text.split())
+    terms = [t for t in terms if t]
+    if not terms:
+        return html.escape(make_excerpt(collapsed, width))
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+
+    match = pattern.search(collapsed)
+    begin = max(0, match.start() - width // 4) if match else 0
+    window = collapsed[begin:begin + width]
+    prefix = "..." if begin > 0 else ""
+    suffix = "..." if begin + width < len(collapsed) else ""
+    parts = [prefix]
+    position = 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[position:match.start()]))
+        parts.append(f"{start}{html.escape(match.group(0))}{end}")
+        position = match.end()
+    parts.append(html.escape(window[position:]))
+    parts.append(suffix)
+    return "".join(parts)
@@ -0,0 +1,281 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.state import InstanceState
+
+from .stats_helper import LATENCY_WINDOW, percentiles
+
+
+_STOP = object()
+# _attempt could not tell which job broke the batch's flush or commit
+_UNATTRIBUTED = object()
+
+
+def _is_persistent(value: Any) -> bool:
+    """Whether ``value`` is an ORM object with a database identity (merge(load=False) needs one)."""
+    state = inspect(value, raiseerr=False)
+    return isinstance(state, InstanceState) and state.key is not None
+
+
+class _Job:
+    __slots__ = ("fn", "args", "future", "queued_at")
+
+    def __init__(self, fn: Callable, args: Tuple):
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class WriteQueue:
+    """
+    Single writer for a SQLite database: write jobs from every request thread go
+    through one bounded queue to one thread, which runs whatever has queued up
+    (up to ``batch_size`` jobs) in a single transaction and commits it once.
+
+    SQLite allows one writer at a time, so request threads committing on their own
+    mostly wait for each other's fsyncs and, in a burst, give up with "database is
+    locked". Here they never contend: the writer takes the lock once per batch
+    (BEGIN IMMEDIATE) and the commit cost is shared by the whole batch. Reads stay
+    on the request sessions and, with WAL, run in parallel.
+
+    When a job raises, the transaction is rolled back, that job's caller gets the
+    error and the rest of the batch runs again without it. Jobs must therefore only
+    write through the session they are given, so running them twice is harmless.
+    The writer keeps one session for its lifetime and flushes once per batch; only
+    when that flush (or the commit) fails is the batch run again flushing after
+    every job, to find the one to blame.
+
+    When the queue is full ``run`` answers 503 with Retry-After rather than queue
+    unboundedly. A disabled queue runs jobs inline on the caller's session.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        enabled: bool,
+        max_queue: int = 1000,
+        batch_size: int = 64,
+        retry_after: int = 1,
+    ):
+        self.engine = engine
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.retry_after = retry_after
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.failed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.max_batch = 0
+        # time from queueing a job to its commit
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def handles(self, db) -> bool:
+        """Whether writes made for ``db`` go through the queue."""
+        if not self.enabled:
+            return False
+        if isinstance(db, AsyncSession):
+            # the async engine is a second way into the same database file
+            return db.get_bind().url.database == self.engine.url.database
+        return isinstance(db, Session) and db.get_bind() is self.engine
+
+    def run(self, db: Session, fn: Callable, *args) -> Any:
+        """
+        Run ``fn(session, *args)`` and commit it; return what ``fn`` returned.
+
+        Through the queue, ``fn`` gets the writer's session. ORM objects among
+        ``args`` (loaded and unmodified on ``db``, e.g. for an authorization check)
+        are handed to it as copies in that session, made without a query; an ORM
+        object ``fn`` returns is merged back into ``db`` the same way, so the caller
+        can refresh it and lazy load from its own session. Otherwise ``fn`` runs on
+        ``db`` with ``args`` as they are and ``db`` is committed right here.
+        """
+        if not self.handles(db):
+            result = fn(db, *args)
+            db.commit()
+            return result
+
+        result = self.submit(fn, *args).result()
+        if _is_persistent(result):
+            result = db.merge(result, load=False)
+        return result
+
+    async def run_async(self, db, fn: Callable, *args) -> Any:
+        """
+        ``run`` for coroutine handlers on an AsyncSession: the queued job is awaited,
+        or without the queue ``fn`` runs on ``db`` through AsyncSession.run_sync and
+        ``db`` is committed, so no thread waits either way. Any other session (a
+        get_async_db override in tests) goes to ``run`` in the thread pool.
+        """
+        if not isinstance(db, AsyncSession):
+            return await run_in_threadpool(self.run, db, fn, *args)
+        if not self.handles(db):
+            result = await db.run_sync(fn, *args)
+            await db.commit()
+            return result
+
+        result = await asyncio.wrap_future(self.submit(fn, *args))
+        if _is_persistent(result):
+            result = await db.merge(result, load=False)
+        return result
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Queue ``fn(session, *args)`` for the writer thread and return its Future."""
+        self._ensure_started()
+        job = _Job(fn, args)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many writes in progress, please retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        return job.future
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="sqlite-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    def stop(self) -> None:
+        """Finish the jobs already queued, then end the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+        session = self._session_factory()
+        try:
+            while True:
+                job = self._queue.get()
+                if job is _STOP:
+                    return
+                batch = [job]
+                stopping = False
+                while len(batch) < self.batch_size:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is _STOP:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._commit(session, batch)
+                if stopping:
+                    return
+        finally:
+            session.close()
+
+    def _commit(self, session: Session, batch: List[_Job]) -> None:
+        jobs = list(batch)
+        done: List[Tuple[_Job, Any]] = []
+        isolate = False
+        while jobs:
+            try:
+                failed, results = self._attempt(session, jobs, isolate)
+            except BaseException as exc:
+                # nothing was committed, so every job still waiting fails with it
+                for job in jobs:
+                    job.future.set_exception(exc)
+                break
+            if failed is None:
+                done = list(zip(jobs, results))
+                break
+            if failed is _UNATTRIBUTED:
+                isolate = True
+                continue
+            # the failing job alone reports its error; the rest run again without it
+            job, exc = failed
+            job.future.set_exception(exc)
+            jobs.remove(job)
+
+        now = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.jobs += len(batch)
+            self.failed += len(batch) - len(done)
+            self.max_batch = max(self.max_batch, len(batch))
+            for job in batch:
+                self._latencies.append(now - job.queued_at)
+        for job, result in done:
+            job.future.set_result(result)
+
+    def _attempt(self, session: Session, jobs: List[_Job], isolate: bool):
+        """
+        Run ``jobs`` in one transaction and commit it. Returns ``(None, results)``;
+        after rolling back, ``((job, exc), None)`` when one of the jobs raised, or
+        ``(_UNATTRIBUTED, None)`` when the batch's flush or commit failed and
+        ``isolate`` (flush after every job) was off.
+        """
+        try:
+            # take the write lock up front; a deferred transaction that upgrades
+            # from read to write can fail with SQLITE_BUSY without waiting
+            session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            results = []
+            for job in jobs:
+                try:
+                    args = [
+                        session.merge(arg, load=False) if _is_persistent(arg) else arg
+                        for arg in job.args
+                    ]
+                    results.append(job.fn(session, *args))
+                    if isolate:
+                        session.flush()
+                except Exception as exc:
+                    session.rollback()
+                    return (job, exc), None
+            try:
+                session.commit()
+            except Exception:
+                if isolate:
+                    raise
+                session.rollback()
+                return _UNATTRIBUTED, None
+            return None, results
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.expunge_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "batch_size": self.batch_size,
+                "jobs": self.jobs,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "mean_batch": round(self.jobs / self.batches, 2) if self.batches else None,
+                "max_batch": self.max_batch,
+                "latency_ms": percentiles(self._latencies),
+            }
+
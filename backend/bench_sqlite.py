@@ -0,0 +1,145 @@
+"""
+Read/write concurrency of a file SQLite database with SQLite's defaults, with the
+production profile from app/utils/sqlite_profile.py (WAL and tuned pragmas), and
+with the profile plus the single-writer queue from app/utils/write_queue.py.
+
+    python bench_sqlite.py [--readers 8] [--writers 1] [--seconds 5] [--rows 20000]
+
+Readers page through a table while writers insert into it one row per
+transaction, the shape of blog traffic; through the queue those transactions are
+group committed. Each mode gets a fresh database file.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.sqlite_profile import DEFAULT_PRAGMAS, apply_pragmas  # noqa: E402
+from app.utils.stats_helper import percentiles  # noqa: E402
+from app.utils.write_queue import WriteQueue  # noqa: E402
+
+
+READ = text("SELECT id, title, body FROM items WHERE id < :before ORDER BY id DESC LIMIT 20")
+WRITE = text("INSERT INTO items (title, body) VALUES (:title, :body)")
+
+
+def make_engine(path: str, tuned: bool, connections: int):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        poolclass=QueuePool,
+        pool_size=connections,
+        max_overflow=0,
+        connect_args={"check_same_thread": False},
+    )
+    if tuned:
+        apply_pragmas(engine, DEFAULT_PRAGMAS)
+    return engine
+
+
+def seed(engine, rows: int) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, title TEXT NOT NULL, body TEXT NOT NULL)"
+        )
+        conn.execute(WRITE, [{"title": f"post {i}", "body": "x" * 500} for i in range(rows)])
+
+
+def insert(db) -> None:
+    db.execute(WRITE, {"title": "new", "body": "y" * 500})
+
+
+def run(tuned: bool, queued: bool, readers: int, writers: int, seconds: float, rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(os.path.join(directory, "bench.db"), tuned, readers + writers + 1)
+        seed(engine, rows)
+        write_queue = WriteQueue(engine, enabled=True) if queued else None
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        read_times, write_times = [], []
+        errors = {"read": 0, "write": 0}
+
+        def reader(offset: int) -> None:
+            before = rows - offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(READ, {"before": before}).all()
+                except exc.OperationalError:
+                    with lock:
+                        errors["read"] += 1
+                    continue
+                with lock:
+                    read_times.append(time.perf_counter() - start)
+                before = before - 20 if before > 20 else rows
+
+        def writer() -> None:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    if write_queue is not None:
+                        write_queue.submit(insert).result()
+                    else:
+                        with engine.begin() as conn:
+                            insert(conn)
+                except exc.OperationalError:
+                    with lock:
+                        errors["write"] += 1
+                    continue
+                with lock:
+                    write_times.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=reader, args=(i * 97,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        batches = None
+        if write_queue is not None:
+            write_queue.stop()
+            batches = write_queue.stats()["mean_batch"]
+        engine.dispose()
+
+    return {
+        "reads/s": round(len(read_times) / seconds),
+        "writes/s": round(len(write_times) / seconds),
+        "read_ms": percentiles(read_times),
+        "write_ms": percentiles(write_times),
+        "errors": errors,
+        "mean_batch": batches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    modes = (
+        ("sqlite defaults", False, False),
+        ("production profile", True, False),
+        ("profile + write queue", True, True),
+    )
+    for label, tuned, queued in modes:
+        result = run(tuned, queued, args.readers, args.writers, args.seconds, args.rows)
+        print(f"{label}:")
+        for key, value in result.items():
+            print(f"  {key:9} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 import pytest
+from datetime import timedelta
+from jose import JWTError
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_db
 from app import models
+from app.utils import auth_helper
+from app.utils.auth_helper import create_access_token, decode_token
+from app.utils.cache import clear_caches, token_cache
+from app.utils import rate_limit
+from app.utils.rate_limit import reset_rate_limits
+from app.utils.hash_executor import HashExecutor
+from app.routers import auth as auth_router
+from app.utils import password_helper
+from app.utils.password_helper import pwd_context
 
 # Test database (SQLite file)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth.db"
@@ -16,8 +26,6 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 # Create test tables
 Base.metadata.drop_all(bind=engine)
@@ -33,6 +41,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_db
 
 client = TestClient(app)
 
@@ -46,12 +55,17 @@ def clear_tables():
     
     # Reset dependency overrides to ensure clean state
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
+    # rows are written behind the API's back, so drop any cached responses
+    clear_caches()
+    reset_rate_limits()
     
     yield
     
     # Teardown: clear any remaining state
     app.dependency_overrides.clear()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
 
 def create_test_user(db, email="kunal@test.com", password="mypassword", role="user", name="Kunal"):
     """Helper function to create a test user directly in the database"""
@@ -124,3 +138,183 @@ def test_me_endpoint_unauthenticated():
     """Test /me endpoint fails when not authenticated"""
     response = client.get("/auth/me")
     assert response.status_code == 401
+
+
+def test_current_user_is_cached_until_user_changes():
+    """Test that repeat authenticated requests skip the users table until the user is updated"""
+    db = TestingSessionLocal()
+    user = create_test_user(db, email="kunal@test.com", password="mypassword", name="Kunal")
+    user_id = user.id
+    db.close()
+    assert client.post("/auth/login", json={"email": "kunal@test.com", "password": "mypassword"}).status_code == 200
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        assert client.get("/auth/me").json()["name"] == "Kunal"
+        statements.clear()
+        assert client.get("/auth/me").json()["name"] == "Kunal"
+        assert statements == []
+
+        # a user updating themselves evicts the cached principal
+        assert client.put(f"/users/{user_id}", json={"name": "Renamed"}).status_code == 200
+        statements.clear()
+        assert client.get("/auth/me").json()["name"] == "Renamed"
+        assert len(statements) == 1
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def test_principal_from_claims_costs_no_query():
+    """Test that endpoints checking only id and role never load the user"""
+    db = TestingSessionLocal()
+    create_test_user(db, email="kunal@test.com", password="mypassword", role="admin")
+    db.close()
+    assert client.post("/auth/login", json={"email": "kunal@test.com", "password": "mypassword"}).status_code == 200
+    client.get("/admin/cache")  # first request may refresh the token watermarks
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        assert client.get("/admin/cache").status_code == 200
+        assert statements == []
+        assert client.delete("/comments/999").status_code == 404
+        assert len(statements) == 1  # the comment lookup only
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def test_verified_tokens_are_memoized():
+    """Test that a token is verified once and then served from the token cache"""
+    token = create_access_token({"sub": "7", "role": "user"})
+    hits = token_cache.hits
+
+    assert decode_token(token)["sub"] == "7"
+    assert decode_token(token)["sub"] == "7"
+    assert token_cache.hits == hits + 1
+
+    # anything that is not the exact verified token is still checked
+    with pytest.raises(JWTError):
+        decode_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+
+    # an expired token is rejected and never cached
+    expired = create_access_token({"sub": "7", "role": "user"}, expires_delta=timedelta(seconds=-1))
+    size = len(token_cache)
+    with pytest.raises(JWTError):
+        decode_token(expired)
+    assert len(token_cache) == size
+
+
+def test_logout_revokes_the_token():
+    """Test that a copy of a logged-out token is rejected, also after a restart"""
+    db = TestingSessionLocal()
+    create_test_user(db, email="kunal@test.com", password="mypassword")
+    db.close()
+
+    login_response = client.post("/auth/login", json={"email": "kunal@test.com", "password": "mypassword"})
+    token = login_response.cookies["session"]
+    headers = {"Authorization": f"Bearer {token}"}
+    stolen = TestClient(app)
+    assert stolen.get("/auth/me", headers=headers).status_code == 200
+
+    assert client.post("/auth/logout").status_code == 200
+    assert stolen.get("/auth/me", headers=headers).status_code == 401
+
+    # a fresh process only knows about the revocation through the table
+    auth_helper._revoked.clear()
+    assert stolen.get("/auth/me", headers=headers).status_code == 200
+    auth_helper.init_revocations(TestingSessionLocal)
+    assert stolen.get("/auth/me", headers=headers).status_code == 401
+
+    db = TestingSessionLocal()
+    assert db.query(models.RevokedToken).count() == 1
+    db.close()
+
+
+def test_expired_revocations_are_compacted():
+    """Test that revoked ids are forgotten once their token has expired"""
+    db = TestingSessionLocal()
+    auth_helper.revoke_token(db, {"jti": "old", "exp": 1.0})
+    auth_helper.revoke_token(db, {"jti": "live", "exp": 4102444800.0})
+    db.commit()
+    db.close()
+
+    auth_helper._compact_revoked(now=1000.0)
+    assert "old" not in auth_helper._revoked and "live" in auth_helper._revoked
+
+    auth_helper.init_revocations(TestingSessionLocal)
+    db = TestingSessionLocal()
+    assert [row.jti for row in db.query(models.RevokedToken).all()] == ["live"]
+    db.close()
+
+
+def test_outdated_hash_is_upgraded_on_login(monkeypatch):
+    """Test that a hash made with other rounds is replaced on the next successful login"""
+    db = TestingSessionLocal()
+    user = create_test_user(db, email="kunal@test.com", password="mypassword")
+    old_hash = user.password_hash
+    db.close()
+
+    # raise the cost; a thread executor so the patched context is the one used
+    monkeypatch.setattr(password_helper, "pwd_context", password_helper._build_context(12000))
+    executor = HashExecutor("thread", workers=1, max_queue=4, retry_after=1)
+    monkeypatch.setattr(auth_router, "password_executor", executor)
+    try:
+        wrong = client.post("/auth/login", json={"email": "kunal@test.com", "password": "nope"})
+        assert wrong.status_code == 401
+
+        db = TestingSessionLocal()
+        assert db.get(models.User, user.id).password_hash == old_hash
+        db.close()
+
+        response = client.post("/auth/login", json={"email": "kunal@test.com", "password": "mypassword"})
+        assert response.status_code == 200
+    finally:
+        executor.shutdown()
+
+    db = TestingSessionLocal()
+    new_hash = db.get(models.User, user.id).password_hash
+    db.close()
+    assert new_hash.startswith("$pbkdf2-sha256$12000$")
+    assert password_helper.verify_password("mypassword", new_hash)
+    assert not password_helper.pwd_context.needs_update(new_hash)
+
+
+def test_calibrate_scales_rounds_to_target():
+    """Test that calibration picks more rounds for a slower target"""
+    fast, _ = password_helper.calibrate(target_ms=5, samples=1)
+    slow, _ = password_helper.calibrate(target_ms=40, samples=1)
+    assert fast % password_helper.ROUNDS_STEP == 0
+    assert password_helper.MIN_ROUNDS <= fast < slow
+
+
+def test_login_flood_is_rejected_before_any_query(monkeypatch):
+    """Test that attempts over the per-email limit get 429 without touching the database"""
+    monkeypatch.setattr(
+        rate_limit, "login_email_limiter",
+        rate_limit.TokenBucketLimiter("login-email", rate_limit.MemoryBucketStore(), 1, 3),
+    )
+    credentials = {"email": "Kunal@test.com", "password": "wrong"}
+    for _ in range(3):
+        assert client.post("/auth/login", json=credentials).status_code == 401
+
+    statements = []
+    count = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        # the email is matched case-insensitively
+        response = client.post("/auth/login", json={**credentials, "email": "kunal@test.com"})
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert statements == []
@@ -0,0 +1,203 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Post
+from app.utils import search_helper
+from app.utils.bm25_index import BM25Index, claim_directory, tokenize
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("The Quick brown fox, and THE dog") == ["quick", "brown", "fox", "dog"]
+
+
+def test_search_ranks_by_bm25():
+    index = BM25Index()
+    index.add(1, "pasta pasta pasta with tomato")
+    index.add(2, "a long story that mentions pasta once among many other words here")
+    index.add(3, "trains across europe")
+
+    hits = index.search("pasta")
+    assert [doc_id for doc_id, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_title_terms_are_boosted():
+    index = BM25Index()
+    index.add(1, "some words about gardening", title="Soup")
+    index.add(2, "a recipe for soup and other words", title="Dinner")
+
+    assert index.search("soup")[0][0] == 1
+
+
+def test_update_and_remove():
+    index = BM25Index()
+    index.add(1, "alpha")
+    index.add(1, "beta")
+    assert index.search("alpha") == []
+    assert [d for d, _ in index.search("beta")] == [1]
+
+    index.remove(1)
+    assert index.search("beta") == []
+    assert len(index) == 0
+
+
+def test_search_pagination():
+    index = BM25Index()
+    for doc_id in range(1, 6):
+        index.add(doc_id, "word " * doc_id)
+
+    first = index.search("word", limit=2)
+    second = index.search("word", limit=2, offset=2)
+    assert len(first) == 2 and len(second) == 2
+    assert not {d for d, _ in first} & {d for d, _ in second}
+
+
+def test_persistence_replays_journal(tmp_path):
+    path = str(tmp_path / "posts")
+    index = BM25Index(path)
+    index.build([(1, "alpha beta", ""), (2, "beta gamma", "")])
+    # these only reach the journal, not the snapshot
+    index.add(3, "gamma delta")
+    index.remove(1)
+
+    restored = BM25Index(path)
+    assert restored.load() is True
+    assert len(restored) == 2
+    assert [d for d, _ in restored.search("delta")] == [3]
+    assert restored.search("alpha") == []
+    assert restored.search("gamma") == index.search("gamma")
+
+
+def test_load_without_snapshot(tmp_path):
+    assert BM25Index(str(tmp_path / "missing")).load() is False
+
+
+def test_compaction_truncates_journal(tmp_path):
+    path = str(tmp_path / "posts")
+    index = BM25Index(path, compact_after=3)
+    index.build([])
+    for doc_id in range(3):
+        index.add(doc_id, "entry")
+
+    with open(f"{path}.journal") as f:
+        assert f.read() == ""
+    restored = BM25Index(path)
+    restored.load()
+    assert len(restored) == 3
+
+
+def test_max_doc_id_tracks_adds_and_removes():
+    index = BM25Index()
+    assert index.max_doc_id == 0
+    index.add(3, "three")
+    index.add(7, "seven")
+    index.add(7, "seven again")
+    assert index.max_doc_id == 7
+    index.remove(7)
+    assert index.max_doc_id == 3
+
+
+def test_claim_directory_gives_each_process_its_own_slot(tmp_path):
+    first, first_lock = claim_directory(str(tmp_path))
+    second, second_lock = claim_directory(str(tmp_path))
+    assert first != second
+
+    first_lock.close()
+    third, third_lock = claim_directory(str(tmp_path))
+    assert third == first
+    second_lock.close()
+    third_lock.close()
+
+
+@pytest.fixture
+def bm25_database(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blog.db'}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(search_helper, "SEARCH_BACKEND", "bm25")
+    monkeypatch.setattr(search_helper, "BM25_INDEX_DIR", str(tmp_path / "index"))
+    session_factory = sessionmaker(bind=engine)
+    yield engine, session_factory
+    search_helper.shutdown_search()
+    engine.dispose()
+
+
+def _insert_post(engine, title):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO posts (title, content) VALUES (:t, 'fruit')"), {"t": title})
+
+
+def _search(session_factory, q):
+    with session_factory() as db:
+        return [hit["id"] for hit in search_helper.search_posts(db, q, limit=20, offset=0)]
+
+
+def test_loaded_index_catches_up_with_the_database(bm25_database):
+    engine, session_factory = bm25_database
+    _insert_post(engine, "kiwi")
+    search_helper.init_search(engine, session_factory)
+    assert len(_search(session_factory, "kiwi")) == 1
+    search_helper.shutdown_search()
+
+    # written by another process while this one was down
+    _insert_post(engine, "kiwi")
+    search_helper.init_search(engine, session_factory)
+    assert len(_search(session_factory, "kiwi")) == 2
+    search_helper.shutdown_search()
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM posts WHERE id = 1"))
+    search_helper.init_search(engine, session_factory)
+    assert _search(session_factory, "kiwi") == [2]
+
+
+def test_running_index_picks_up_other_workers_writes(bm25_database, monkeypatch):
+    engine, session_factory = bm25_database
+    search_helper.init_search(engine, session_factory)
+    monkeypatch.setattr(search_helper, "BM25_SYNC_SECONDS", 0)
+
+    _insert_post(engine, "mango")
+    assert len(_search(session_factory, "mango")) == 1
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM posts"))
+    assert _search(session_factory, "mango") == []
+    assert len(search_helper.post_index) == 0
+
+
+def _edit_post(session_factory, post_id, content):
+    # an ORM write from another worker, which sets updated_at
+    with session_factory() as db:
+        db.get(Post, post_id).content = content
+        db.commit()
+
+
+def test_edits_made_elsewhere_reach_the_index(bm25_database, monkeypatch):
+    engine, session_factory = bm25_database
+    _insert_post(engine, "kiwi")
+    search_helper.init_search(engine, session_factory)
+    monkeypatch.setattr(search_helper, "BM25_SYNC_SECONDS", 0)
+
+    _edit_post(session_factory, 1, "papaya")
+    assert _search(session_factory, "papaya") == [1]
+    assert _search(session_factory, "fruit") == []
+    search_helper.shutdown_search()
+
+    # edited while this worker was down: same row count, only the watermark tells
+    _edit_post(session_factory, 1, "guava")
+    search_helper.init_search(engine, session_factory)
+    assert _search(session_factory, "guava") == [1]
+    assert _search(session_factory, "papaya") == []
+
+
+def test_watermark_survives_a_restart(tmp_path):
+    path = str(tmp_path / "posts")
+    index = BM25Index(path)
+    index.build([(1, "alpha", "")])
+    index.watermark = "2026-01-01 00:00:00"
+    index.close()
+
+    reloaded = BM25Index(path)
+    assert reloaded.load()
+    assert reloaded.watermark == "2026-01-01 00:00:00"
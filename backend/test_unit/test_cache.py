@@ -0,0 +1,102 @@
+import time
+
+from app.utils.cache import ResponseCache, TTLCache, etag_matches, make_etag
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)  # "b" is least recently used
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.evictions == 1
+
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None
+
+
+def test_ttl_cache_rejects_value_read_before_delete():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    generation = cache.generation(1)
+    cache.delete(1)  # a write lands while the row is being read
+    cache.set(1, "stale", generation=generation)
+    assert cache.get(1) is None
+
+    generation = cache.generation(1)
+    cache.set(1, "fresh", generation=generation)
+    assert cache.get(1) == "fresh"
+
+    # keys whose generation was forgotten, and everything after clear(), stay guarded
+    generations = cache.generations([1, 2])
+    cache.delete(2, 3, 4)
+    cache.set(2, "stale", generation=generations[2])
+    assert cache.get(2) is None
+    generation = cache.generation(5)
+    cache.clear()
+    cache.set(5, "stale", generation=generation)
+    assert cache.get(5) is None
+
+
+def test_response_cache_bounded_by_bytes():
+    cache = ResponseCache("test", maxsize=100, max_bytes=10, ttl=60)
+    cache.set("a", b"12345", "etag", ("t",), cache.versions(("t",)))
+    cache.set("b", b"12345", "etag", ("t",), cache.versions(("t",)))
+    cache.set("c", b"1", "etag", ("t",), cache.versions(("t",)))
+
+    assert cache.get("a") is None
+    assert cache.get("b") == (b"12345", "etag")
+    assert cache.stats()["bytes"] == 6
+    assert cache.evictions == 1
+
+    # a body larger than the whole cache is never stored
+    cache.set("big", b"x" * 11, "etag", ("t",), cache.versions(("t",)))
+    assert cache.get("big") is None
+
+
+def test_response_cache_invalidates_by_tag():
+    cache = ResponseCache("test", maxsize=100, max_bytes=1000, ttl=60)
+    cache.set("list", b"[1,2]", "etag", ("posts",), cache.versions(("posts",)))
+    cache.set("post:1", b"{1}", "etag", ("post:1",), cache.versions(("post:1",)))
+    cache.set("post:2", b"{2}", "etag", ("post:2",), cache.versions(("post:2",)))
+
+    cache.invalidate("posts", "post:1")
+
+    assert cache.get("list") is None
+    assert cache.get("post:1") is None
+    assert cache.get("post:2") == (b"{2}", "etag")
+    assert cache.stats()["bytes"] == 3
+
+
+def test_response_cache_rejects_body_built_before_invalidation():
+    cache = ResponseCache("test", maxsize=100, max_bytes=1000, ttl=60)
+    versions = cache.versions(("post:1",))
+    cache.invalidate("post:1")  # a write lands while the body is being built
+    cache.set("post:1", b"stale", "etag", ("post:1",), versions)
+    assert cache.get("post:1") is None
+
+    versions = cache.versions(("*", "post:1"))
+    cache.clear()
+    cache.set("post:1", b"stale", "etag", ("*", "post:1"), versions)
+    assert cache.get("post:1") is None
+
+
+def test_response_cache_expires():
+    cache = ResponseCache("test", maxsize=100, max_bytes=1000, ttl=0.01)
+    cache.set("a", b"1", "etag", (), ())
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_etag_matching():
+    etag = make_etag(b'{"a":1}')
+    assert etag == make_etag(b'{"a":1}') != make_etag(b'{"a":2}')
+    assert etag.startswith('"') and etag.endswith('"')
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
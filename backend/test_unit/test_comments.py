@@ -2,11 +2,13 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_db
 from app import models
+from app.utils.cache import clear_caches
+from app.utils.rate_limit import reset_rate_limits
+from app.utils.password_helper import pwd_context
 
 # Test database (SQLite file)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_comments.db"
@@ -16,8 +18,6 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 # Create test tables
 Base.metadata.drop_all(bind=engine)
@@ -33,6 +33,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_db
 
 client = TestClient(app)
 
@@ -46,12 +47,17 @@ def clear_tables():
     
     # Reset dependency overrides to ensure clean state
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
+    # rows are written behind the API's back, so drop any cached responses
+    clear_caches()
+    reset_rate_limits()
     
     yield
     
     # Teardown: clear any remaining state
     app.dependency_overrides.clear()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
 
 
 def create_test_user(db, email="test@example.com", password="testpass123", role="user", name="Test User"):
@@ -155,7 +161,7 @@ def test_list_comments_for_post():
     response = client.get(f"/comments/post/{post_id}")
     
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) == 3
     
     for comment in data:
@@ -186,7 +192,35 @@ def test_list_comments_empty_post():
     
     # Assertions
     assert response.status_code == 200
-    assert response.json() == []
+    assert response.json()["items"] == []
+
+
+def test_list_comments_cursor_pagination():
+    """Test walking a comment thread page by page"""
+    db = TestingSessionLocal()
+    user = create_test_user(db, email="user@test.com", password="pass123")
+    post = create_test_post(db, title="Busy Post", owner_id=user.id)
+    post_id = post.id
+    db.add_all([
+        models.Comment(content=f"Comment {i}", post_id=post_id, user_id=user.id)
+        for i in range(5)
+    ])
+    db.commit()
+    db.close()
+
+    seen = []
+    cursor = None
+    while True:
+        url = f"/comments/post/{post_id}?limit=2"
+        if cursor:
+            url += f"&after={cursor}"
+        page = client.get(url).json()
+        seen.extend(c["content"] for c in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [f"Comment {i}" for i in range(4, -1, -1)]
 
 
 def test_update_own_comment():
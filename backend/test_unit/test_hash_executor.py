@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.hash_executor import HashExecutor
+
+
+def test_hash_executor_rejects_past_queue_bound():
+    executor = HashExecutor("thread", workers=1, max_queue=0, retry_after=2)
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["in_flight"] == 1
+
+        with pytest.raises(HTTPException) as exc:
+            await executor.run(str.upper, "x")
+        # pacing callers (bulk import) are not turned away
+        paced = asyncio.ensure_future(executor.run(str.upper, "x", admit=False))
+
+        release.set()
+        return exc.value, await busy, await paced
+
+    try:
+        error, busy_result, paced_result = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "2"
+    assert busy_result is True
+    assert paced_result == "X"
+
+    stats = executor.stats()
+    assert stats["in_flight"] == 0
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["hash_ms"]["max"] is not None
+
+
+def test_hash_executor_run_sync():
+    executor = HashExecutor("thread", workers=1, max_queue=0, retry_after=1)
+    try:
+        assert executor.run_sync(str.upper, "abc") == "ABC"
+    finally:
+        executor.shutdown()
+    assert executor.stats()["completed"] == 1
+
+
+def test_process_executor_does_not_fork():
+    executor = HashExecutor("process", workers=1, max_queue=0, retry_after=1)
+    try:
+        assert executor.run_sync(str.upper, "x") == "X"
+        assert executor._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        executor.shutdown()
+
+
+def test_cancelled_calls_keep_their_slot_until_the_pool_is_done():
+    executor = HashExecutor("thread", workers=1, max_queue=1, retry_after=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        # both clients go away; the first hash is still running
+        running.cancel()
+        queued.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+
+        # the queued call left the pool with its cancellation, the running one did not
+        assert executor.stats()["in_flight"] == 1
+        queued_again = asyncio.ensure_future(executor.run(str.upper, "x"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException):
+            await executor.run(str.upper, "y")
+
+        release.set()
+        assert await queued_again == "X"
+        await asyncio.sleep(0.05)
+        return executor.stats()["in_flight"]
+
+    try:
+        assert asyncio.run(scenario()) == 0
+    finally:
+        release.set()
+        executor.shutdown()
@@ -1,10 +1,22 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app import database, models
+from app.database import Base, get_async_db, get_db
+from app.utils import search_helper
+from app.utils import write_queue as write_queue_module
+from app.utils.auth_helper import SESSION_COOKIE_NAME, create_access_token
+from app.utils.bm25_index import BM25Index
+from app.routers import auth as auth_router, comments as comments_router, posts as posts_router
+from app.utils.cache import clear_caches
+from app.utils.rate_limit import reset_rate_limits
+from app.utils.password_helper import pwd_context
+from app.utils.write_queue import WriteQueue
 
 # Test database (SQLite file)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_blog.db"
@@ -29,6 +41,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_db
 
 client = TestClient(app)
 
@@ -38,6 +51,11 @@ def clear_tables():
     # Cleanup before each test (simple approach)
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # other test modules install their own database override at import time
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
+    clear_caches()
+    reset_rate_limits()
 
 
 def test_create_post():
@@ -49,10 +67,431 @@ def test_create_post():
 def test_list_posts_empty():
     response = client.get("/posts/")
     assert response.status_code == 200
-    assert response.json() == []
+    assert response.json()["items"] == []
+    assert response.json()["next_cursor"] is None
 
 
 def test_create_and_get_post():
     payload = {"title": "My Post", "content": "Hello World"}
     create_res = client.post("/posts/", json=payload)
     assert create_res.status_code == 401
+
+
+def test_list_posts_cursor_walk():
+    db = TestingSessionLocal()
+    # inserted within the same second, so ordering falls back to the id tie-breaker
+    db.add_all([models.Post(title=f"Post {i}", content="Body") for i in range(5)])
+    db.commit()
+    db.close()
+
+    first = client.get("/posts/?limit=2").json()
+    assert [p["title"] for p in first["items"]] == ["Post 4", "Post 3"]
+    assert first["prev_cursor"] is None
+
+    second = client.get(f"/posts/?limit=2&after={first['next_cursor']}").json()
+    assert [p["title"] for p in second["items"]] == ["Post 2", "Post 1"]
+
+    last = client.get(f"/posts/?limit=2&after={second['next_cursor']}").json()
+    assert [p["title"] for p in last["items"]] == ["Post 0"]
+    assert last["next_cursor"] is None
+
+    back = client.get(f"/posts/?limit=2&before={last['prev_cursor']}").json()
+    assert [p["title"] for p in back["items"]] == ["Post 2", "Post 1"]
+
+
+def test_list_posts_has_no_unbounded_mode():
+    db = TestingSessionLocal()
+    db.add_all([models.Post(title=f"Post {i}", content="Body") for i in range(3)])
+    db.commit()
+    db.close()
+
+    # the old all=true escape hatch is ignored; GET /export/posts streams everything
+    response = client.get("/posts/?all=true&limit=1")
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 1
+    assert response.json()["next_cursor"] is not None
+
+
+def test_list_posts_summary_view():
+    db = TestingSessionLocal()
+    db.add(models.Post(title="Long read", content="word " * 500))
+    db.commit()
+    db.close()
+
+    response = client.get("/posts/?view=summary")
+    assert response.status_code == 200
+    item = response.json()["items"][0]
+    assert item["title"] == "Long read"
+    assert item["word_count"] == 500
+    assert item["excerpt"].endswith("...")
+    assert len(item["excerpt"]) <= 203
+    assert "content" not in item
+
+
+def login_as_new_user(email="author@test.com", password="pass123", role="user"):
+    db = TestingSessionLocal()
+    user = models.User(email=email, name="Author", password_hash=pwd_context.hash(password), role=role)
+    db.add(user)
+    db.commit()
+    db.close()
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+
+
+def test_search_posts_ranked_with_snippets():
+    login_as_new_user()
+    client.post("/posts/", json={"title": "Cooking pasta", "content": "Boil water, add salt and pasta."})
+    client.post("/posts/", json={"title": "Gardening", "content": "Tomatoes go well with pasta sauce."})
+    client.post("/posts/", json={"title": "Travel", "content": "Trains across Europe."})
+
+    response = client.get("/posts/search?q=pasta")
+    assert response.status_code == 200
+    hits = response.json()
+    # title matches are weighted above body matches
+    assert [h["title"] for h in hits] == ["Cooking pasta", "Gardening"]
+    assert "<mark>pasta</mark>" in hits[1]["snippet"]
+
+
+def test_search_snippets_escape_post_html():
+    login_as_new_user()
+    client.post(
+        "/posts/",
+        json={"title": "Payload", "content": "<script>alert(1)</script> <img src=x onerror=alert(2)>"},
+    )
+
+    hits = client.get("/posts/search?q=script").json()
+    assert len(hits) == 1
+    snippet = hits[0]["snippet"]
+    assert "<script>" not in snippet and "<img" not in snippet
+    assert "&lt;<mark>script</mark>&gt;alert(1)&lt;/<mark>script</mark>&gt;" in snippet
+
+
+def test_search_index_follows_update_and_delete():
+    login_as_new_user()
+    post_id = client.post("/posts/", json={"title": "Draft", "content": "alpha"}).json()["id"]
+
+    client.put(f"/posts/{post_id}", json={"title": "Draft", "content": "beta"})
+    assert client.get("/posts/search?q=alpha").json() == []
+    assert [h["id"] for h in client.get("/posts/search?q=beta").json()] == [post_id]
+
+    client.delete(f"/posts/{post_id}")
+    assert client.get("/posts/search?q=beta").json() == []
+
+
+def test_search_posts_ignores_query_syntax():
+    response = client.get('/posts/search?q="unbalanced AND (')
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_search_posts_with_bm25_backend(monkeypatch):
+    monkeypatch.setattr(search_helper, "post_index", BM25Index())
+    monkeypatch.setattr(search_helper, "comment_index", BM25Index())
+    login_as_new_user()
+    keep = client.post("/posts/", json={"title": "Sourdough", "content": "Bread needs starter."}).json()["id"]
+    gone = client.post("/posts/", json={"title": "Flatbread", "content": "Bread without starter."}).json()["id"]
+    client.delete(f"/posts/{gone}")
+
+    hits = client.get("/posts/search?q=bread").json()
+    assert [h["id"] for h in hits] == [keep]
+    assert "<mark>Bread</mark>" in hits[0]["snippet"]
+    assert hits[0]["rank"] > 0
+
+    comment = client.post("/comments/", json={"post_id": keep, "content": "Great crumb on this loaf"})
+    assert comment.status_code == 201
+    hits = client.get("/comments/search?q=crumb").json()
+    assert [h["id"] for h in hits] == [comment.json()["id"]]
+
+
+def test_bm25_snippets_escape_html(monkeypatch):
+    monkeypatch.setattr(search_helper, "post_index", BM25Index())
+    monkeypatch.setattr(search_helper, "comment_index", BM25Index())
+    login_as_new_user()
+    post_id = client.post(
+        "/posts/", json={"title": "Payload", "content": "<b>bold</b> claim & <script>alert(1)</script>"}
+    ).json()["id"]
+    client.post("/comments/", json={"post_id": post_id, "content": "<img src=x onerror=alert(2)> claim"})
+
+    post_snippet = client.get("/posts/search?q=claim").json()[0]["snippet"]
+    assert post_snippet == (
+        "&lt;b&gt;bold&lt;/b&gt; <mark>claim</mark> &amp; &lt;script&gt;alert(1)&lt;/script&gt;"
+    )
+    comment_snippet = client.get("/comments/search?q=claim").json()[0]["snippet"]
+    assert comment_snippet == "&lt;img src=x onerror=alert(2)&gt; <mark>claim</mark>"
+
+
+def test_posts_batch_cache_invalidated_on_update():
+    login_as_new_user()
+    post_id = client.post("/posts/", json={"title": "Before", "content": "Body"}).json()["id"]
+
+    assert client.get(f"/posts/batch?ids={post_id}").json()["items"][0]["title"] == "Before"
+    client.put(f"/posts/{post_id}", json={"title": "After", "content": "Body"})
+    assert client.get(f"/posts/batch?ids={post_id}").json()["items"][0]["title"] == "After"
+
+    client.delete(f"/posts/{post_id}")
+    assert client.get(f"/posts/batch?ids={post_id}").json()["missing"] == [post_id]
+
+
+def test_cached_responses_follow_writes():
+    login_as_new_user(role="admin")
+    post_id = client.post("/posts/", json={"title": "Before", "content": "Body"}).json()["id"]
+
+    for _ in range(2):
+        assert client.get(f"/posts/{post_id}").json()["title"] == "Before"
+        assert client.get("/posts/").json()["items"][0]["comment_count"] == 0
+        assert client.get(f"/comments/post/{post_id}").json()["items"] == []
+
+    client.put(f"/posts/{post_id}", json={"title": "After", "content": "Body"})
+    client.post("/comments/", json={"post_id": post_id, "content": "First"})
+
+    assert client.get(f"/posts/{post_id}").json()["title"] == "After"
+    assert client.get("/posts/").json()["items"][0]["comment_count"] == 1
+    assert [c["content"] for c in client.get(f"/comments/post/{post_id}").json()["items"]] == ["First"]
+
+    client.delete(f"/posts/{post_id}")
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert client.get("/posts/").json()["items"] == []
+
+    stats = {c["name"]: c for c in client.get("/admin/cache").json()}
+    assert stats["responses"]["hits"] >= 3
+    assert stats["responses"]["misses"] >= 3
+
+
+def test_conditional_get_with_etag():
+    login_as_new_user()
+    post_id = client.post("/posts/", json={"title": "Polled", "content": "Body"}).json()["id"]
+
+    for url in ("/posts/", f"/posts/{post_id}", f"/comments/post/{post_id}"):
+        first = client.get(url)
+        etag = first.headers["etag"]
+
+        not_modified = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+
+        assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    # a write changes the body and therefore the tag
+    client.post("/comments/", json={"post_id": post_id, "content": "New"})
+    response = client.get(f"/comments/post/{post_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_bulk_create_posts_reports_per_item_results():
+    login_as_new_user()
+    items = [
+        {"title": "One", "content": "first body"},
+        {"title": "Missing content"},
+        {"title": "Three", "content": "third body here"},
+    ]
+    response = client.post("/posts/bulk?batch_size=1", json=items)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2 and data["invalid"] == 1
+    statuses = [r["status"] for r in data["results"]]
+    assert statuses == ["created", "invalid", "created"]
+    assert data["results"][1]["errors"][0]["loc"] == ["content"]
+
+    created_ids = [r["id"] for r in data["results"] if r["id"]]
+    posts = client.get(f"/posts/batch?ids={','.join(map(str, created_ids))}").json()["items"]
+    assert [p["title"] for p in posts] == ["One", "Three"]
+
+    summary = client.get("/posts/?view=summary").json()["items"]
+    assert {p["title"]: p["word_count"] for p in summary} == {"One": 2, "Three": 3}
+    assert [h["title"] for h in client.get("/posts/search?q=third").json()] == ["Three"]
+
+
+def test_get_post_full_uses_fixed_number_of_queries():
+    login_as_new_user()
+    post_id = client.post("/posts/", json={"title": "Thread", "content": "Body"}).json()["id"]
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        counts = []
+        for new_comments in (3, 27):
+            for _ in range(new_comments):
+                client.post("/comments/", json={"post_id": post_id, "content": "hi"})
+            statements.clear()
+            response = client.get(f"/posts/{post_id}/full?limit=10")
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert counts[0] == counts[1] == 2
+    data = response.json()
+    assert data["title"] == "Thread"
+    assert data["comment_count"] == 30
+    assert data["owner"]["name"] == "Author"
+    assert "email" not in data["owner"]
+    assert len(data["comments"]["items"]) == 10
+    assert data["comments"]["items"][0]["author_name"] == "Author"
+
+    # the cursor continues with the regular comments endpoint
+    rest = client.get(f"/comments/post/{post_id}?limit=10&after={data['comments']['next_cursor']}")
+    assert len(rest.json()["items"]) == 10
+
+
+def test_get_post_full_not_found():
+    assert client.get("/posts/999/full").status_code == 404
+
+
+def test_bulk_create_posts_requires_auth():
+    fresh_client = TestClient(app)
+    response = fresh_client.post("/posts/bulk", json=[{"title": "t", "content": "c"}])
+    assert response.status_code == 401
+
+
+def test_create_post_through_sqlite_write_queue(monkeypatch):
+    """Test that posts and comments committed by the single writer behave as before"""
+    queue = WriteQueue(engine, enabled=True)
+    monkeypatch.setattr(posts_router, "write_queue", queue)
+    monkeypatch.setattr(comments_router, "write_queue", queue)
+    login_as_new_user()
+    try:
+        response = client.post("/posts/", json={"title": "Queued pasta", "content": "Written by the writer"})
+        assert response.status_code == 201
+        post = response.json()
+        assert post["title"] == "Queued pasta" and post["created_at"]
+
+        comment = client.post("/comments/", json={"post_id": post["id"], "content": "Nice"})
+        assert comment.status_code == 201
+        assert comment.json()["author_name"] == "Author"
+
+        missing = client.post("/comments/", json={"post_id": 9999, "content": "Nope"})
+        assert missing.status_code == 404
+    finally:
+        queue.stop()
+
+    assert client.get(f"/posts/{post['id']}").json()["comment_count"] == 1
+    # the search index is updated once the writer commits
+    assert [hit["id"] for hit in client.get("/posts/search?q=pasta").json()] == [post["id"]]
+    assert queue.stats()["jobs"] == 2
+
+
+def test_update_and_delete_post_through_sqlite_write_queue(monkeypatch):
+    """Test that updates and deletes committed by the single writer behave as before"""
+    queue = WriteQueue(engine, enabled=True)
+    monkeypatch.setattr(posts_router, "write_queue", queue)
+    monkeypatch.setattr(comments_router, "write_queue", queue)
+    login_as_new_user()
+    try:
+        post_id = client.post("/posts/", json={"title": "Draft", "content": "First"}).json()["id"]
+        client.post("/comments/", json={"post_id": post_id, "content": "Hi"})
+
+        response = client.put(f"/posts/{post_id}", json={"title": "Final", "content": "Second"})
+        assert response.status_code == 200
+        assert response.json()["title"] == "Final"
+        assert response.json()["comment_count"] == 1
+
+        assert client.delete(f"/posts/{post_id}").status_code == 204
+    finally:
+        queue.stop()
+
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert queue.stats()["jobs"] == 4
+
+
+def use_async_engine(monkeypatch):
+    """Serve get_async_db from an aiosqlite engine and fail any use of the thread pool."""
+    pytest.importorskip("aiosqlite")
+    # a new event loop per request here, so connections are not pooled across them
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test_blog.db", poolclass=NullPool)
+    AsyncTestingSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    def no_threadpool(*args, **kwargs):
+        raise AssertionError("a query went through the thread pool")
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    monkeypatch.setattr(database, "run_in_threadpool", no_threadpool)
+    monkeypatch.setattr(write_queue_module, "run_in_threadpool", no_threadpool)
+
+
+def test_hot_reads_run_on_the_async_engine(monkeypatch):
+    use_async_engine(monkeypatch)
+
+    db = TestingSessionLocal()
+    user = models.User(email="async@example.com", name="Async", password_hash="x", role="user")
+    db.add(user)
+    db.flush()
+    post = models.Post(title="Async post", content="Body", owner_id=user.id)
+    db.add(post)
+    db.flush()
+    db.add(models.Comment(content="First", post_id=post.id, user_id=user.id))
+    db.commit()
+    user_id, post_id = user.id, post.id
+    db.close()
+
+    page = client.get("/posts/?limit=1").json()
+    assert [p["title"] for p in page["items"]] == ["Async post"]
+    assert client.get(f"/posts/{post_id}").json()["comment_count"] == 1
+    assert client.get("/posts/999").status_code == 404
+
+    comments = client.get(f"/comments/post/{post_id}").json()
+    assert [(c["content"], c["author_name"]) for c in comments["items"]] == [("First", "Async")]
+
+    token = create_access_token({"sub": str(user_id), "role": "user"})
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json()["email"] == "async@example.com"
+
+
+@pytest.mark.parametrize("queued", [False, True])
+def test_writes_run_on_the_async_engine(monkeypatch, queued):
+    """Test that post and comment writes and logout hold no thread, with or without the writer"""
+    use_async_engine(monkeypatch)
+    queue = WriteQueue(engine, enabled=queued)
+    for module in (posts_router, comments_router, auth_router):
+        monkeypatch.setattr(module, "write_queue", queue)
+    login_as_new_user()
+    try:
+        response = client.post("/posts/", json={"title": "Async pasta", "content": "Boiled"})
+        assert response.status_code == 201
+        assert response.json()["created_at"]
+        post_id = response.json()["id"]
+
+        bulk = client.post("/posts/bulk", json=[{"title": "Bulk", "content": "One"}, {"title": ""}])
+        assert (bulk.json()["created"], bulk.json()["invalid"]) == (1, 1)
+
+        comment = client.post("/comments/", json={"post_id": post_id, "content": "Nice"})
+        assert comment.status_code == 201
+        assert comment.json()["author_name"] == "Author"
+        comment_id = comment.json()["id"]
+        assert client.post("/comments/", json={"post_id": 9999, "content": "Nope"}).status_code == 404
+
+        edited = client.put(f"/comments/{comment_id}", json={"content": "Very nice"})
+        assert (edited.json()["content"], edited.json()["author_name"]) == ("Very nice", "Author")
+
+        updated = client.put(f"/posts/{post_id}", json={"title": "Async pasta", "content": "Simmered"})
+        assert updated.status_code == 200
+        assert updated.json()["comment_count"] == 1
+
+        assert [hit["id"] for hit in client.get("/posts/search?q=pasta").json()] == [post_id]
+        assert client.get(f"/posts/batch?ids={post_id}").json()["items"][0]["content"] == "Simmered"
+        full = client.get(f"/posts/{post_id}/full").json()
+        assert full["owner"]["name"] == "Author"
+        assert [c["content"] for c in full["comments"]["items"]] == ["Very nice"]
+
+        assert client.delete(f"/comments/{comment_id}").status_code == 204
+        assert client.delete(f"/posts/{post_id}").status_code == 204
+
+        token = client.cookies.get(SESSION_COOKIE_NAME)
+        assert client.post("/auth/logout").status_code == 200
+    finally:
+        queue.stop()
+
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    # the token was revoked, not just dropped from the cookie jar
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert queue.stats()["jobs"] == (8 if queued else 0)
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import rate_limit
+from app.utils.rate_limit import MemoryBucketStore, SQLiteBucketStore, TokenBucketLimiter
+
+
+def test_token_bucket_allows_burst_then_limits():
+    limiter = TokenBucketLimiter("test", MemoryBucketStore(shards=4), per_minute=60, burst=3)
+
+    assert [limiter.hit("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = limiter.hit("a")
+    assert 0 < wait <= 1.0
+    # other keys have their own bucket
+    assert limiter.hit("b") == 0.0
+
+
+def test_memory_store_is_bounded():
+    store = MemoryBucketStore(shards=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        store.take(key, rate=1, burst=1)
+
+    # "a" was dropped, so it comes back with a full bucket
+    assert store.take("a", rate=1, burst=1) == 0.0
+    assert store.take("c", rate=1, burst=1) > 0
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    worker_a = TokenBucketLimiter("login", SQLiteBucketStore(path), per_minute=1, burst=2)
+    worker_b = TokenBucketLimiter("login", SQLiteBucketStore(path), per_minute=1, burst=2)
+
+    assert worker_a.hit("1.2.3.4") == 0.0
+    assert worker_b.hit("1.2.3.4") == 0.0
+    assert worker_a.hit("1.2.3.4") > 0
+
+
+def test_zero_rate_disables_limiter():
+    limiter = TokenBucketLimiter("test", MemoryBucketStore(), per_minute=0, burst=1)
+    assert all(limiter.hit("a") == 0.0 for _ in range(10))
+
+
+def test_blocking_store_is_checked_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    class RecordingStore(SQLiteBucketStore):
+        def take(self, key, rate, burst):
+            threads.append(threading.get_ident())
+            return super().take(key, rate, burst)
+
+    store = RecordingStore(str(tmp_path / "buckets.db"))
+    monkeypatch.setattr(rate_limit, "_store", store)
+    monkeypatch.setattr(rate_limit.login_ip_limiter, "store", store)
+    monkeypatch.setattr(rate_limit.login_email_limiter, "store", store)
+    request = SimpleNamespace(client=SimpleNamespace(host="1.2.3.4"))
+
+    async def scenario():
+        await rate_limit.check_login_rate_async(request, "a@example.com")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads and loop_thread not in threads
+
+
+def test_incomplete_store_fails_when_created():
+    class TakeOnly(rate_limit.BucketStore):
+        def take(self, key, rate, burst):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        TakeOnly()
@@ -1,12 +1,20 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app import database
+from app.database import Base, get_async_db, get_db
 from app import models
+from app.routers import auth as auth_router, users as users_router
+from app.utils import write_queue as write_queue_module
+from app.utils.cache import clear_caches
+from app.utils.rate_limit import reset_rate_limits
+from app.utils.password_helper import pwd_context
+from app.utils.write_queue import WriteQueue
 
 # Test database (SQLite file)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_users.db"
@@ -16,8 +24,6 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 # Create test tables
 Base.metadata.drop_all(bind=engine)
@@ -33,6 +39,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_db
 
 client = TestClient(app)
 
@@ -46,12 +53,17 @@ def clear_tables():
     
     # Reset dependency overrides to ensure clean state
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
+    # rows are written behind the API's back, so drop any cached responses
+    clear_caches()
+    reset_rate_limits()
     
     yield
     
     # Teardown: clear any remaining state
     app.dependency_overrides.clear()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
 
 
 def create_test_user(db, email="test@example.com", password="testpass123", role="user", name="Test User"):
@@ -377,3 +389,183 @@ def test_admin_cannot_delete_self():
     # Assertions
     assert response.status_code == 400
     assert "Cannot delete your own account" in response.json()["detail"]
+
+
+def test_role_change_revokes_existing_tokens():
+    """Test that tokens issued before a role change stop working"""
+    db = TestingSessionLocal()
+    admin = create_test_user(db, email="admin@test.com", password="admin123", role="admin")
+    user = create_test_user(db, email="user@test.com", password="user123", role="admin")
+    user_id = user.id
+    db.close()
+
+    user_client = TestClient(app)
+    assert user_client.post("/auth/login", json={"email": "user@test.com", "password": "user123"}).status_code == 200
+    assert user_client.get("/admin/cache").status_code == 200
+
+    assert login_user("admin@test.com", "admin123").status_code == 200
+    assert client.put(f"/users/{user_id}", json={"role": "user"}).status_code == 200
+
+    # the old token still says "admin", so it must not be accepted at all
+    response = user_client.get("/admin/cache")
+    assert response.status_code == 401
+
+    assert user_client.post("/auth/login", json={"email": "user@test.com", "password": "user123"}).status_code == 200
+    assert user_client.get("/admin/cache").status_code == 403
+    assert user_client.get("/auth/me").json()["role"] == "user"
+
+
+def test_deleted_user_tokens_are_rejected():
+    """Test that a deleted user's session no longer authenticates"""
+    db = TestingSessionLocal()
+    create_test_user(db, email="admin@test.com", password="admin123", role="admin")
+    user = create_test_user(db, email="user@test.com", password="user123")
+    user_id = user.id
+    db.close()
+
+    user_client = TestClient(app)
+    assert user_client.post("/auth/login", json={"email": "user@test.com", "password": "user123"}).status_code == 200
+
+    assert login_user("admin@test.com", "admin123").status_code == 200
+    assert client.delete(f"/users/{user_id}").status_code == 204
+
+    assert user_client.post("/posts/", json={"title": "t", "content": "c"}).status_code == 401
+
+
+def test_import_users_csv_as_admin():
+    """Test that an admin can bulk import users from CSV, with duplicates and bad rows reported"""
+    db = TestingSessionLocal()
+    create_test_user(db, email="admin@test.com", password="admin123", role="admin")
+    create_test_user(db, email="taken@test.com", password="taken123")
+    db.close()
+    assert login_user("admin@test.com", "admin123").status_code == 200
+
+    body = (
+        "email,name,password,role\n"
+        "one@test.com,User One,pass1,\n"
+        "taken@test.com,Taken,pass2,\n"
+        "\n"
+        "not-an-email,Bad,pass3,\n"
+        "two@test.com,User Two,pass4,admin\n"
+        "one@test.com,Again,pass5,\n"
+        "short,row\n"
+    )
+    response = client.post("/users/import", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["duplicates"], data["invalid"]) == (2, 2, 2)
+    assert [(r["line"], r["status"]) for r in data["results"]] == [
+        (2, "created"),
+        (3, "duplicate"),
+        (5, "invalid"),
+        (6, "created"),
+        (7, "duplicate"),
+        (8, "invalid"),
+    ]
+    assert "pass3" not in response.text
+
+    db = TestingSessionLocal()
+    two = db.query(models.User).filter(models.User.email == "two@test.com").first()
+    assert two.id == data["results"][3]["id"]
+    assert two.role == "admin"
+    assert db.query(models.User).filter(models.User.email == "one@test.com").first().role == "user"
+    db.close()
+
+    # imported passwords are hashed like any other
+    assert login_user("two@test.com", "pass4").status_code == 200
+
+
+def test_import_users_ndjson_and_json():
+    """Test NDJSON and JSON array uploads"""
+    db = TestingSessionLocal()
+    create_test_user(db, email="admin@test.com", password="admin123", role="admin")
+    db.close()
+    assert login_user("admin@test.com", "admin123").status_code == 200
+
+    ndjson = (
+        '{"email": "a@test.com", "name": "A", "password": "pa"}\n'
+        "[1, 2]\n"
+        '{"email": "b@test.com", "name": "B", "password": "pb"}'
+    )
+    response = client.post(
+        "/users/import", content=ndjson, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == ["created", "invalid", "created"]
+
+    response = client.post(
+        "/users/import",
+        json=[{"email": "b@test.com", "name": "B", "password": "pb"},
+              {"email": "c@test.com", "name": "C", "password": "pc"}],
+    )
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == ["duplicate", "created"]
+
+
+def test_import_users_requires_admin():
+    """Test that regular users cannot import and unknown formats are rejected"""
+    db = TestingSessionLocal()
+    create_test_user(db, email="admin@test.com", password="admin123", role="admin")
+    create_test_user(db, email="user@test.com", password="user123")
+    db.close()
+
+    assert login_user("user@test.com", "user123").status_code == 200
+    response = client.post("/users/import", content="email,name,password\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 403
+
+    assert login_user("admin@test.com", "admin123").status_code == 200
+    response = client.post("/users/import", content="x", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize("queued", [False, True])
+def test_user_endpoints_run_on_the_async_engine(monkeypatch, queued):
+    """Test that user reads and writes hold no thread, with or without the writer"""
+    pytest.importorskip("aiosqlite")
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test_users.db", poolclass=NullPool)
+    AsyncTestingSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    def no_threadpool(*args, **kwargs):
+        raise AssertionError("a query went through the thread pool")
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    monkeypatch.setattr(database, "run_in_threadpool", no_threadpool)
+    monkeypatch.setattr(write_queue_module, "run_in_threadpool", no_threadpool)
+    queue = WriteQueue(engine, enabled=queued)
+    monkeypatch.setattr(users_router, "write_queue", queue)
+    monkeypatch.setattr(auth_router, "write_queue", queue)
+
+    db = TestingSessionLocal()
+    create_test_user(db, email="admin@test.com", password="admin123", role="admin", name="Admin")
+    db.close()
+    try:
+        assert login_user("admin@test.com", "admin123").status_code == 200
+
+        response = client.post(
+            "/users/", json={"email": "new@test.com", "name": "New", "password": "newpass"}
+        )
+        assert response.status_code == 201
+        user_id = response.json()["id"]
+        duplicate = client.post(
+            "/users/", json={"email": "new@test.com", "name": "New", "password": "newpass"}
+        )
+        assert duplicate.status_code == 400
+
+        assert sorted(u["email"] for u in client.get("/users/").json()) == ["admin@test.com", "new@test.com"]
+        assert client.get(f"/users/batch?ids={user_id},999").json()["missing"] == [999]
+
+        updated = client.put(f"/users/{user_id}", json={"name": "Renamed", "password": "other"})
+        assert updated.status_code == 200
+        assert client.get(f"/users/{user_id}").json()["name"] == "Renamed"
+
+        assert client.delete(f"/users/{user_id}").status_code == 204
+        assert client.get(f"/users/{user_id}").status_code == 404
+    finally:
+        queue.stop()
+
+    assert queue.stats()["jobs"] == (3 if queued else 0)
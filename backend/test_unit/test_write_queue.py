@@ -0,0 +1,159 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, String, create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.utils.write_queue import WriteQueue
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'writes.db'}", connect_args={"check_same_thread": False}
+    )
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    yield engine
+    engine.dispose()
+
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+
+
+def insert(db, name):
+    db.execute(text("INSERT INTO items (name) VALUES (:name)"), {"name": name})
+    return name
+
+
+def names(engine):
+    with engine.connect() as conn:
+        return sorted(conn.exec_driver_sql("SELECT name FROM items").scalars())
+
+
+def test_queued_writes_are_group_committed(engine):
+    queue = WriteQueue(engine, enabled=True)
+    release = threading.Event()
+    started = threading.Event()
+    try:
+        # hold the writer so the next jobs pile up behind it
+        first = queue.submit(lambda db: started.set() or release.wait(5))
+        started.wait(5)
+        futures = [queue.submit(insert, f"item {i}") for i in range(10)]
+        release.set()
+        assert [future.result(5) for future in futures] == [f"item {i}" for i in range(10)]
+        first.result(5)
+    finally:
+        queue.stop()
+
+    assert len(names(engine)) == 10
+    stats = queue.stats()
+    assert stats["jobs"] == 11
+    assert stats["batches"] == 2 and stats["max_batch"] == 10
+
+
+def test_failed_job_only_fails_itself(engine):
+    queue = WriteQueue(engine, enabled=True)
+    release = threading.Event()
+    try:
+        queue.submit(lambda db: release.wait(5))
+        ok = queue.submit(insert, "a")
+        duplicate = queue.submit(insert, "a")
+        other = queue.submit(insert, "b")
+        release.set()
+        assert ok.result(5) == "a" and other.result(5) == "b"
+        with pytest.raises(IntegrityError):
+            duplicate.result(5)
+    finally:
+        queue.stop()
+
+    assert names(engine) == ["a", "b"]
+    assert queue.stats()["failed"] == 1
+
+
+def test_full_queue_rejects_with_retry_after(engine):
+    queue = WriteQueue(engine, enabled=True, max_queue=1, retry_after=3)
+    release = threading.Event()
+    started = threading.Event()
+    try:
+        queue.submit(lambda db: started.set() or release.wait(5))
+        started.wait(5)
+        queue.submit(insert, "waiting")
+        with pytest.raises(HTTPException) as exc:
+            queue.submit(insert, "rejected")
+        release.set()
+    finally:
+        queue.stop()
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "3"
+    assert names(engine) == ["waiting"]
+
+
+def test_disabled_queue_commits_inline(engine):
+    queue = WriteQueue(engine, enabled=False)
+    db = sessionmaker(bind=engine)()
+    try:
+        assert queue.run(db, insert, "inline") == "inline"
+    finally:
+        db.close()
+    assert names(engine) == ["inline"]
+    assert queue.stats()["jobs"] == 0
+
+
+def add(db, name):
+    item = Item(name=name)
+    db.add(item)
+    return item
+
+
+def rename(db, item, name):
+    item.name = name
+    return item
+
+
+def test_failed_flush_is_charged_to_its_job(engine):
+    # ORM writes only reach the database when the batch is flushed at commit
+    queue = WriteQueue(engine, enabled=True)
+    release = threading.Event()
+    started = threading.Event()
+    try:
+        queue.submit(lambda db: started.set() or release.wait(5))
+        started.wait(5)
+        ok = queue.submit(add, "a")
+        duplicate = queue.submit(add, "a")
+        other = queue.submit(add, "b")
+        release.set()
+        assert ok.result(5).name == "a" and other.result(5).name == "b"
+        with pytest.raises(IntegrityError):
+            duplicate.result(5)
+    finally:
+        queue.stop()
+
+    assert names(engine) == ["a", "b"]
+    assert queue.stats()["failed"] == 1
+
+
+def test_objects_loaded_by_the_caller_reach_the_writer(engine):
+    queue = WriteQueue(engine, enabled=True)
+    db = sessionmaker(bind=engine)()
+    try:
+        item = queue.run(db, add, "before")
+        assert item in db
+        renamed = queue.run(db, rename, item, "after")
+        assert renamed is item
+        db.refresh(item)
+        assert item.name == "after"
+    finally:
+        db.close()
+        queue.stop()
+    assert names(engine) == ["after"]
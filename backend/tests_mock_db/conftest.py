@@ -1,16 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, Mock, patch
-from passlib.context import CryptContext
 from app.main import app
-from app.database import get_db
+from app.database import get_async_db, get_db
+from app.utils.cache import clear_caches
+from app.utils.rate_limit import reset_rate_limits
 from app.models.user_model import User
 from app.models.post_model import Post
 from app.models.comment_model import Comment
-
-
-# Password hashing context for tests
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+from app.utils.password_helper import pwd_context
 
 
 @pytest.fixture
@@ -40,7 +38,10 @@ def create_mock_post(post_id=1, title="Test Post", content="Test content", owner
     mock_post.id = post_id
     mock_post.title = title
     mock_post.content = content
+    mock_post.excerpt = content[:200]
+    mock_post.word_count = len(content.split())
     mock_post.owner_id = owner_id
+    mock_post.comment_count = 0
     mock_post.created_at = datetime.now()
     return mock_post
 
@@ -67,6 +68,9 @@ def client(mock_db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
+    clear_caches()
+    reset_rate_limits()
     
     with TestClient(app) as test_client:
         yield test_client
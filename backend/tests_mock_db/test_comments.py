@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from app import models
 from app.main import app
-from app.utils.auth_helper import get_current_user
+from app.utils.auth_helper import get_current_principal, get_current_user
 from tests_mock_db.conftest import create_mock_user, create_mock_comment
 
 
@@ -33,7 +33,7 @@ class TestComments:
         ]
         
         mock_order = MagicMock()
-        mock_order.all.return_value = result_tuples
+        mock_order.limit.return_value.all.return_value = result_tuples
         mock_filter = MagicMock()
         mock_filter.order_by.return_value = mock_order
         mock_join = MagicMock()
@@ -45,7 +45,7 @@ class TestComments:
         response = client.get("/comments/post/1")
         
         assert response.status_code == 200
-        data = response.json()
+        data = response.json()["items"]
         assert len(data) == 3
         assert all("id" in comment for comment in data)
         assert all("content" in comment for comment in data)
@@ -53,15 +53,35 @@ class TestComments:
     def test_list_comments_empty_post(self, client, mock_db):
         """Test listing comments for a post with no comments"""
         mock_filter = MagicMock()
-        mock_filter.all.return_value = []
+        mock_filter.order_by.return_value.limit.return_value.all.return_value = []
         mock_query = MagicMock()
-        mock_query.filter.return_value = mock_filter
+        mock_query.join.return_value.filter.return_value = mock_filter
         mock_db.query.return_value = mock_query
         
         response = client.get("/comments/post/1")
         
         assert response.status_code == 200
-        assert response.json() == []
+        assert response.json()["items"] == []
+        assert response.json()["next_cursor"] is None
+
+    def test_list_comments_next_cursor(self, client, mock_db):
+        """Test that a full page of comments returns a next_cursor"""
+        mock_comments = [create_mock_comment(i, f"Comment {i}", post_id=1) for i in range(3, 0, -1)]
+
+        mock_filter = MagicMock()
+        mock_filter.order_by.return_value.limit.return_value.all.return_value = [
+            (c, "User One") for c in mock_comments
+        ]
+        mock_query = MagicMock()
+        mock_query.join.return_value.filter.return_value = mock_filter
+        mock_db.query.return_value = mock_query
+
+        response = client.get("/comments/post/1?limit=2")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [c["id"] for c in data["items"]] == [3, 2]
+        assert data["next_cursor"] is not None
 
     def test_update_own_comment(self, client, mock_db):
         """Test that a user can update their own comment"""        
@@ -102,10 +122,10 @@ class TestComments:
         mock_query.filter.return_value = mock_filter
         mock_db.query.return_value = mock_query
         
-        def override_get_current_user():
+        def override_get_current_principal():
             return mock_user
         
-        app.dependency_overrides[get_current_user] = override_get_current_user
+        app.dependency_overrides[get_current_principal] = override_get_current_principal
         
         try:
             response = client.put("/comments/1", json={
@@ -114,7 +134,7 @@ class TestComments:
             
             assert response.status_code == 403
         finally:
-            app.dependency_overrides.pop(get_current_user, None)
+            app.dependency_overrides.pop(get_current_principal, None)
 
     def test_delete_own_comment(self, client, mock_db):
         """Test that a user can delete their own comment"""        
@@ -152,15 +172,15 @@ class TestComments:
         mock_query.filter.return_value = mock_filter
         mock_db.query.return_value = mock_query
         
-        def override_get_current_user():
+        def override_get_current_principal():
             return mock_user
-        app.dependency_overrides[get_current_user] = override_get_current_user
+        app.dependency_overrides[get_current_principal] = override_get_current_principal
         
         try:
             response = client.delete("/comments/1")
             assert response.status_code == 403
         finally:
-            app.dependency_overrides.pop(get_current_user, None)
+            app.dependency_overrides.pop(get_current_principal, None)
 
     def test_delete_nonexistent_comment(self, client, mock_db):
         """Test deleting a comment that doesn't exist"""        
@@ -169,13 +189,18 @@ class TestComments:
         mock_query.get.return_value = None
         mock_db.query.return_value = mock_query
         
-        def override_get_current_user():
+        def override_get_current_principal():
             return mock_user
-        app.dependency_overrides[get_current_user] = override_get_current_user
+        app.dependency_overrides[get_current_principal] = override_get_current_principal
         
         try:
             response = client.delete("/comments/99999")
             
             assert response.status_code == 404
         finally:
-            app.dependency_overrides.pop(get_current_user, None)
+            app.dependency_overrides.pop(get_current_principal, None)
+
+    def test_search_comments_without_bm25_backend(self, client, mock_db):
+        """Test that comment search reports 501 unless the BM25 backend is enabled"""
+        response = client.get("/comments/search?q=hello")
+        assert response.status_code == 501
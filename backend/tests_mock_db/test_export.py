@@ -0,0 +1,71 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from app.main import app
+from app.utils.auth_helper import get_current_principal
+from tests_mock_db.conftest import create_mock_user, create_mock_post, create_mock_comment
+
+
+class TestExport:
+    """Test suite for the NDJSON export endpoints"""
+
+    def test_export_posts_unauthenticated(self, client):
+        """Test that exporting requires authentication"""
+        response = client.get("/export/posts")
+        assert response.status_code == 401
+
+    def test_export_posts_requires_admin(self, client, mock_db):
+        """Test that a regular user cannot export"""
+        mock_user = create_mock_user(user_id=2, role="user")
+
+        app.dependency_overrides[get_current_principal] = lambda: mock_user
+        try:
+            response = client.get("/export/posts")
+            assert response.status_code == 403
+        finally:
+            app.dependency_overrides.pop(get_current_principal, None)
+
+    def test_export_posts_streams_ndjson(self, client, mock_db):
+        """Test that posts are streamed one JSON document per line"""
+        mock_admin = create_mock_user(user_id=1, role="admin")
+        batches = [
+            [create_mock_post(1, "Post 1", "Content 1"), create_mock_post(2, "Post 2", "Content 2")],
+            [create_mock_post(3, "Post 3", "Content 3")],
+        ]
+        mock_result = MagicMock()
+        mock_result.partitions.return_value = iter(batches)
+        mock_db.execute.return_value = mock_result
+
+        app.dependency_overrides[get_current_principal] = lambda: mock_admin
+        try:
+            response = client.get("/export/posts")
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert [line["id"] for line in lines] == [1, 2, 3]
+            assert lines[0]["content"] == "Content 1"
+
+            stmt = mock_db.execute.call_args.args[0]
+            assert stmt.get_execution_options()["yield_per"] > 0
+        finally:
+            app.dependency_overrides.pop(get_current_principal, None)
+
+    def test_export_comments_streams_ndjson(self, client, mock_db):
+        """Test that comments are streamed one JSON document per line"""
+        mock_admin = create_mock_user(user_id=1, role="admin")
+        mock_result = MagicMock()
+        mock_result.partitions.return_value = iter([
+            [create_mock_comment(1, "First", post_id=1), create_mock_comment(2, "Second", post_id=2)],
+        ])
+        mock_db.execute.return_value = mock_result
+
+        app.dependency_overrides[get_current_principal] = lambda: mock_admin
+        try:
+            response = client.get("/export/comments")
+
+            assert response.status_code == 200
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert [(c["id"], c["post_id"]) for c in lines] == [(1, 1), (2, 2)]
+        finally:
+            app.dependency_overrides.pop(get_current_principal, None)
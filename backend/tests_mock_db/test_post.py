@@ -15,14 +15,14 @@ class TestPosts:
     def test_create_post_authenticated(self, client, mock_db):
         """Test creating a post when authenticated"""
         from app.main import app
-        from app.utils.auth_helper import get_current_user
+        from app.utils.auth_helper import get_current_principal
         
         mock_user = create_mock_user(user_id=1, email="user@test.com")
         
-        def override_get_current_user():
+        def override_get_current_principal():
             return mock_user
         
-        app.dependency_overrides[get_current_user] = override_get_current_user
+        app.dependency_overrides[get_current_principal] = override_get_current_principal
         
         try:
             with patch('app.routers.posts.models.Post') as MockPost:
@@ -38,17 +38,38 @@ class TestPosts:
                 mock_db.add.assert_called_once()
                 mock_db.commit.assert_called_once()
         finally:
-            app.dependency_overrides.pop(get_current_user, None)
+            app.dependency_overrides.pop(get_current_principal, None)
     
+    def test_bulk_create_posts_batches_inserts(self, client, mock_db):
+        """Test that bulk creation inserts valid items batch by batch in one commit"""
+        from app.main import app
+        from app.utils.auth_helper import get_current_principal
+
+        mock_db.execute.return_value.scalars.return_value.all.side_effect = [[10, 11], [12]]
+        app.dependency_overrides[get_current_principal] = lambda: create_mock_user(user_id=1)
+
+        try:
+            items = [{"title": f"Post {i}", "content": "Body"} for i in range(3)] + [{"content": "no title"}]
+            response = client.post("/posts/bulk?batch_size=2", json=items)
+
+            assert response.status_code == 200
+            data = response.json()
+            assert [r["id"] for r in data["results"]] == [10, 11, 12, None]
+            assert data["results"][3]["status"] == "invalid"
+            assert mock_db.execute.call_count == 2
+            mock_db.commit.assert_called_once()
+        finally:
+            app.dependency_overrides.pop(get_current_principal, None)
+
     def test_list_posts_empty(self, client, mock_db):
         """Test listing posts when database is empty"""
         mock_query = MagicMock()
-        mock_query.all.return_value = []
+        mock_query.order_by.return_value.limit.return_value.all.return_value = []
         mock_db.query.return_value = mock_query
         
         response = client.get("/posts/")
         assert response.status_code == 200
-        assert response.json() == []
+        assert response.json() == {"items": [], "next_cursor": None, "prev_cursor": None}
 
     def test_list_posts_with_data(self, client, mock_db):
         """Test listing posts when posts exist"""
@@ -60,16 +81,111 @@ class TestPosts:
         ]
         
         mock_query = MagicMock()
-        mock_query.all.return_value = mock_posts
+        mock_query.order_by.return_value.limit.return_value.all.return_value = mock_posts
         mock_db.query.return_value = mock_query
         
         response = client.get("/posts/")
         assert response.status_code == 200
-        data = response.json()
+        data = response.json()["items"]
         assert len(data) == 3
         assert all("id" in post for post in data)
         assert all("title" in post for post in data)
 
+    def test_list_posts_has_next_cursor(self, client, mock_db):
+        """Test that a full page returns a cursor for the next page"""
+        mock_posts = [create_mock_post(i, f"Post {i}", "Content") for i in range(3, 0, -1)]
+
+        mock_query = MagicMock()
+        mock_query.order_by.return_value.limit.return_value.all.return_value = mock_posts
+        mock_db.query.return_value = mock_query
+
+        response = client.get("/posts/?limit=2")
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["id"] for p in data["items"]] == [3, 2]
+        assert data["next_cursor"] is not None
+        mock_query.order_by.return_value.limit.assert_called_once_with(3)
+
+    def test_list_posts_invalid_cursor(self, client, mock_db):
+        """Test that a malformed cursor is rejected"""
+        response = client.get("/posts/?after=not-a-cursor")
+        assert response.status_code == 400
+
+    def test_list_posts_has_no_unbounded_mode(self, client, mock_db):
+        """Test that all=true no longer lifts the page size limit"""
+        mock_posts = [create_mock_post(i, f"Post {i}", "Content") for i in range(3, 0, -1)]
+
+        mock_query = MagicMock()
+        mock_query.order_by.return_value.limit.return_value.all.return_value = mock_posts
+        mock_db.query.return_value = mock_query
+
+        response = client.get("/posts/?all=true&limit=2")
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == 2
+        mock_query.order_by.return_value.limit.assert_called_once_with(3)
+
+    def test_list_posts_summary_view(self, client, mock_db):
+        """Test that view=summary returns excerpts instead of full content"""
+        mock_posts = [create_mock_post(1, "Post 1", "Some long content body", owner_id=1)]
+
+        mock_query = MagicMock()
+        mock_query.order_by.return_value.limit.return_value.all.return_value = mock_posts
+        mock_db.query.return_value = mock_query
+
+        response = client.get("/posts/?view=summary")
+        assert response.status_code == 200
+        item = response.json()["items"][0]
+        assert item["excerpt"] == "Some long content body"
+        assert item["word_count"] == 4
+        assert "content" not in item
+        # only the summary columns are selected, not the mapped Post entity
+        assert all(arg is not models.Post for arg in mock_db.query.call_args.args)
+
+    def test_search_posts_without_fts_backend(self, client, mock_db):
+        """Test that search reports 501 when the database has no full-text index"""
+        response = client.get("/posts/search?q=hello")
+        assert response.status_code == 501
+
+    def test_search_posts_requires_query(self, client):
+        """Test that an empty search query is rejected"""
+        response = client.get("/posts/search?q=")
+        assert response.status_code == 422
+
+    def test_get_posts_batch_in_request_order(self, client, mock_db):
+        """Test multi-get returns posts in request order with explicit misses"""
+        mock_query = MagicMock()
+        mock_query.filter.return_value.all.return_value = [
+            create_mock_post(1, "Post 1", "Content 1"),
+            create_mock_post(3, "Post 3", "Content 3"),
+        ]
+        mock_db.query.return_value = mock_query
+
+        response = client.get("/posts/batch?ids=3,2,1")
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["id"] if p else None for p in data["items"]] == [3, None, 1]
+        assert data["missing"] == [2]
+        mock_query.filter.assert_called_once()
+
+    def test_get_posts_batch_served_from_cache(self, client, mock_db):
+        """Test that ids fetched once are served without another query"""
+        mock_query = MagicMock()
+        mock_query.filter.return_value.all.return_value = [create_mock_post(1, "Post 1", "Content 1")]
+        mock_db.query.return_value = mock_query
+
+        client.get("/posts/batch?ids=1")
+        mock_db.query.reset_mock()
+
+        response = client.get("/posts/batch?ids=1")
+        assert response.json()["items"][0]["title"] == "Post 1"
+        mock_db.query.assert_not_called()
+
+    def test_get_posts_batch_rejects_bad_ids(self, client, mock_db):
+        """Test that malformed or oversized id lists are rejected"""
+        assert client.get("/posts/batch?ids=1,abc").status_code == 400
+        too_many = ",".join(str(i) for i in range(501))
+        assert client.get(f"/posts/batch?ids={too_many}").status_code == 400
+
     def test_get_post_by_id_success(self, client, mock_db):
         """Test getting a specific post by ID"""
         
@@ -111,7 +227,7 @@ class TestPosts:
     def test_delete_post_as_owner(self, client, mock_db):
         """Test deleting a post as the owner"""
         from app.main import app
-        from app.utils.auth_helper import get_current_user
+        from app.utils.auth_helper import get_current_principal
         
         mock_user = create_mock_user(user_id=1)
         mock_post = create_mock_post(1, "Test Post", "Content", owner_id=1)
@@ -120,10 +236,10 @@ class TestPosts:
         mock_query.get.return_value = mock_post
         mock_db.query.return_value = mock_query
         
-        def override_get_current_user():
+        def override_get_current_principal():
             return mock_user
         
-        app.dependency_overrides[get_current_user] = override_get_current_user
+        app.dependency_overrides[get_current_principal] = override_get_current_principal
         
         try:
             response = client.delete("/posts/1")
@@ -132,4 +248,4 @@ class TestPosts:
             mock_db.delete.assert_called_once_with(mock_post)
             mock_db.commit.assert_called_once()
         finally:
-            app.dependency_overrides.pop(get_current_user, None)
+            app.dependency_overrides.pop(get_current_principal, None)
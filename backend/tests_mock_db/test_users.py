@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from app import models
 from app.main import app
+from app.utils.auth_helper import get_current_principal
 from tests_mock_db.conftest import create_mock_user
 
 class TestUsers:
@@ -72,6 +73,22 @@ class TestUsers:
         assert data["name"] == "Specific User"
 
 
+    def test_get_users_batch(self, client, mock_db):
+        """Test multi-get of users with a miss"""
+        mock_query = MagicMock()
+        mock_query.filter.return_value.all.return_value = [
+            create_mock_user(2, "two@test.com", "User Two"),
+        ]
+        mock_db.query.return_value = mock_query
+
+        response = client.get("/users/batch?ids=2,7")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["items"][0]["email"] == "two@test.com"
+        assert data["items"][1] is None
+        assert data["missing"] == [7]
+
     def test_update_user_as_admin(self, client, mock_db):
         """Test that admin can update user information"""
         
@@ -82,7 +99,8 @@ class TestUsers:
         mock_query.get.return_value = mock_user
         mock_db.query.return_value = mock_query
         
-        with patch('app.routers.users.get_current_user', return_value=mock_admin):
+        app.dependency_overrides[get_current_principal] = lambda: mock_admin
+        try:
             response = client.put("/users/2", json={
                 "name": "Updated Name",
                 "role": "admin"
@@ -90,6 +108,8 @@ class TestUsers:
             
             if response.status_code == 200:
                 mock_db.commit.assert_called()
+        finally:
+            app.dependency_overrides.pop(get_current_principal, None)
 
     def test_delete_user_as_admin(self, client, mock_db):
         """Test that admin can delete other users"""        
@@ -100,9 +120,12 @@ class TestUsers:
         mock_query.get.return_value = mock_user
         mock_db.query.return_value = mock_query
         
-        with patch('app.routers.users.get_current_user', return_value=mock_admin):
+        app.dependency_overrides[get_current_principal] = lambda: mock_admin
+        try:
             response = client.delete("/users/2")
             
             if response.status_code in [200, 204]:
                 mock_db.delete.assert_called_once_with(mock_user)
-                mock_db.commit.assert_called()
\ No newline at end of file
+                mock_db.commit.assert_called()
+        finally:
+            app.dependency_overrides.pop(get_current_principal, None)
\ No newline at end of file
@@ -9,6 +9,8 @@ import EditPostModal from "./posts/EditPostModal";
 function AdminPostsPanel() {
   const API_BASE = import.meta.env.VITE_API_BASE;
   const [posts, setPosts] = useState([]);
+  const [postsCursor, setPostsCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedPost, setSelectedPost] = useState(null);
   const [status, setStatus] = useState("");
   const [showCreateModal, setShowCreateModal] = useState(false);
@@ -19,12 +21,31 @@ function AdminPostsPanel() {
       const res = await fetch(`${API_BASE}/posts/`);
       if (!res.ok) throw new Error("Failed to load posts");
       const data = await res.json();
-      setPosts(data);
+      setPosts(data.items);
+      setPostsCursor(data.next_cursor);
     } catch (err) {
       setStatus(err.message || "Error loading posts");
     }
   }
 
+  async function loadMorePosts() {
+    if (!postsCursor) return;
+    try {
+      setLoadingMore(true);
+      const res = await fetch(
+        `${API_BASE}/posts/?after=${encodeURIComponent(postsCursor)}`
+      );
+      if (!res.ok) throw new Error("Failed to load posts");
+      const data = await res.json();
+      setPosts((prev) => [...prev, ...data.items]);
+      setPostsCursor(data.next_cursor);
+    } catch (err) {
+      setStatus(err.message || "Error loading posts");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   useEffect(() => {
     loadPosts();
   }, []);
@@ -92,6 +113,17 @@ function AdminPostsPanel() {
             onDelete={handleDeletePost}
             onRefresh={loadPosts}
           />
+          {postsCursor && (
+            <div className="flex justify-center mt-4">
+              <Button
+                onClick={loadMorePosts}
+                disabled={loadingMore}
+                variant="outline"
+              >
+                {loadingMore ? "Loading..." : "Load more posts"}
+              </Button>
+            </div>
+          )}
         </section>
       </div>
 
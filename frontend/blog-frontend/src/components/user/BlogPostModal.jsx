@@ -2,7 +2,17 @@ import React from "react";
 import CommentList from "./CommentList";
 import CommentForm from "./CommentForm";
 
-function BlogPostModal({ post, comments, currentUser, onClose, onAddComment, onEditComment, onDeleteComment }) {
+function BlogPostModal({
+    post,
+    comments,
+    hasMoreComments,
+    onLoadMoreComments,
+    currentUser,
+    onClose,
+    onAddComment,
+    onEditComment,
+    onDeleteComment,
+}) {
     if (!post) return null;
 
     return (
@@ -47,7 +57,7 @@ function BlogPostModal({ post, comments, currentUser, onClose, onAddComment, onE
                             <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                                 <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M7 8h10M7 12h4m1 8l-4-4H5a2 2 0 01-2-2V6a2 2 0 012-2h14a2 2 0 012 2v8a2 2 0 01-2 2h-3l-4 4z" />
                             </svg>
-                            Comments ({comments.length})
+                            Comments ({post.comment_count ?? comments.length})
                         </h3>
 
                         {/* Comment Form */}
@@ -66,6 +76,17 @@ function BlogPostModal({ post, comments, currentUser, onClose, onAddComment, onE
                             onEdit={onEditComment}
                             onDelete={onDeleteComment}
                         />
+
+                        {hasMoreComments && (
+                            <div className="flex justify-center mt-4">
+                                <button
+                                    onClick={onLoadMoreComments}
+                                    className="bg-sky-600 hover:bg-sky-700 text-white text-xs font-medium px-3 py-2 rounded-lg"
+                                >
+                                    Load older comments
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
             </div>
@@ -6,10 +6,14 @@ import BlogPostModal from "../components/user/BlogPostModal";
 
 function UserBlogPage({ currentUser, onLogout }) {
   const [posts, setPosts] = useState([]);
+  // next_cursor of the last page loaded; null once there is nothing older
+  const [postsCursor, setPostsCursor] = useState(null);
   const [selectedPost, setSelectedPost] = useState(null);
   const [comments, setComments] = useState([]);
+  const [commentsCursor, setCommentsCursor] = useState(null);
   const [status, setStatus] = useState("");
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   async function loadPosts() {
     try {
@@ -17,7 +21,8 @@ function UserBlogPage({ currentUser, onLogout }) {
       const res = await apiGet(`/posts/`);
       if (!res.ok) throw new Error("Failed to load posts");
       const data = await res.json();
-      setPosts(data);
+      setPosts(data.items);
+      setPostsCursor(data.next_cursor);
     } catch (err) {
       setStatus(err.message || "Error loading posts");
     } finally {
@@ -25,29 +30,82 @@ function UserBlogPage({ currentUser, onLogout }) {
     }
   }
 
+  async function loadMorePosts() {
+    if (!postsCursor) return;
+    try {
+      setLoadingMore(true);
+      const res = await apiGet(`/posts/?after=${encodeURIComponent(postsCursor)}`);
+      if (!res.ok) throw new Error("Failed to load posts");
+      const data = await res.json();
+      setPosts((prev) => [...prev, ...data.items]);
+      setPostsCursor(data.next_cursor);
+    } catch (err) {
+      setStatus(err.message || "Error loading posts");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   async function loadComments(postId) {
     try {
       const res = await apiGet(`/comments/post/${postId}`);
       if (!res.ok) throw new Error("Failed to load comments");
       const data = await res.json();
-      setComments(data);
+      setComments(data.items);
+      setCommentsCursor(data.next_cursor);
     } catch (err) {
       setStatus(err.message || "Error loading comments");
     }
   }
 
+  async function loadMoreComments() {
+    if (!selectedPost || !commentsCursor) return;
+    try {
+      const res = await apiGet(
+        `/comments/post/${selectedPost.id}?after=${encodeURIComponent(commentsCursor)}`
+      );
+      if (!res.ok) throw new Error("Failed to load comments");
+      const data = await res.json();
+      setComments((prev) => [...prev, ...data.items]);
+      setCommentsCursor(data.next_cursor);
+    } catch (err) {
+      setStatus(err.message || "Error loading comments");
+    }
+  }
+
+  function adjustCommentCount(delta) {
+    setSelectedPost((prev) =>
+      prev && prev.comment_count !== undefined
+        ? { ...prev, comment_count: prev.comment_count + delta }
+        : prev
+    );
+  }
+
   useEffect(() => {
     loadPosts();
   }, []);
 
-  function openPost(post) {
+  async function openPost(post) {
     setSelectedPost(post);
-    loadComments(post.id);
+    setComments([]);
+    setCommentsCursor(null);
+    try {
+      // post, owner and first page of comments in one round trip
+      const res = await apiGet(`/posts/${post.id}/full`);
+      if (!res.ok) throw new Error("Failed to load post");
+      const data = await res.json();
+      setSelectedPost(data);
+      setComments(data.comments.items);
+      setCommentsCursor(data.comments.next_cursor);
+    } catch (err) {
+      setStatus(err.message || "Error loading post");
+    }
   }
 
   function closeModal() {
     setSelectedPost(null);
     setComments([]);
+    setCommentsCursor(null);
   }
 
   async function handleAddComment(commentText) {
@@ -59,6 +117,7 @@ function UserBlogPage({ currentUser, onLogout }) {
         post_id: selectedPost.id,
       });
       if (!res.ok) throw new Error("Failed to submit comment");
+      adjustCommentCount(1);
       loadComments(selectedPost.id);
       setStatus("Comment added successfully!");
       setTimeout(() => setStatus(""), 3000);
@@ -86,6 +145,7 @@ function UserBlogPage({ currentUser, onLogout }) {
     try {
       const res = await apiDelete(`/comments/${commentId}`);
       if (res.status !== 204) throw new Error("Failed to delete comment");
+      adjustCommentCount(-1);
       loadComments(selectedPost.id);
       setStatus("Comment deleted!");
       setTimeout(() => setStatus(""), 3000);
@@ -145,6 +205,18 @@ function UserBlogPage({ currentUser, onLogout }) {
             ))}
           </div>
         )}
+
+        {!loading && postsCursor && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMorePosts}
+              disabled={loadingMore}
+              className="bg-sky-600 hover:bg-sky-700 disabled:opacity-60 text-white text-sm font-medium px-4 py-2 rounded-lg"
+            >
+              {loadingMore ? "Loading..." : "Load more posts"}
+            </button>
+          </div>
+        )}
       </main>
 
       {/* Blog Post Modal */}
@@ -152,6 +224,8 @@ function UserBlogPage({ currentUser, onLogout }) {
         <BlogPostModal
           post={selectedPost}
           comments={comments}
+          hasMoreComments={Boolean(commentsCursor)}
+          onLoadMoreComments={loadMoreComments}
           currentUser={currentUser}
           onClose={closeModal}
           onAddComment={handleAddComment}